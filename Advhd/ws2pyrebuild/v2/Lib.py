@@ -1,5 +1,10 @@
-import json, os, re, io
-import subprocess
+import json, os, re, io, sys
+import struct
+import hashlib
+import contextlib
+import collections
+from concurrent.futures import ProcessPoolExecutor
+from ws2codec import xor_repeat
 
 def open_file_b(path)->bytes:
     return open(path,'rb').read()
@@ -15,13 +20,17 @@ def listdir(path):
 
 def save_file_b(path, data, enc = None)->None:
     if enc:
-        data = bytearray(data)
-        for i in range(len(data)):
-            data[i] ^= enc[i % len(enc)]
-        data = bytes(data)
+        data = xor_repeat(data, enc)
     with open(path,'wb') as f:
         f.write(data)
 
+def hash_file(path):
+    # 返回文件内容的哈希 (十六进制)，文件不存在时返回 None
+    if not path or not os.path.isfile(path):
+        return None
+    with open(path, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
 def save_json(path:str,data)->None:
     with open(path,'w',encoding='utf8') as f:
         json.dump(data,f,ensure_ascii=False,indent=4)
@@ -33,15 +42,19 @@ def open_json(path:str):
 def to_bytes(num:int,length:int)->bytes:
     return num.to_bytes(length,byteorder='little')
 
+# GBK 无法编码的单字符替换合并为一张 str.translate 表，一次遍历完成
+GBK_SYMBOL_TABLE = str.maketrans({"〜": "～", "♪": None, "♡": None, "・": "·", "⋯": "…"})
+
 def replace_symbol_for_gbk(text):
-    text = text.replace("〜","～")
-    text = text.replace("♪", "")
-    text = text.replace("♡", "")
-    text = text.replace("・", "·").replace("･･･", "…").replace("⋯", "…")
-    text = text.replace("「「", "「")
-    text = text.replace("」」", "」")
-    text = text.replace("「「", "「")
-    text = text.replace("」」", "」")
+    text = text.translate(GBK_SYMBOL_TABLE)
+    # 多字符的替换只在包含时执行
+    if "･･･" in text:
+        text = text.replace("･･･", "…")
+    # 重复的括号折叠两次 (与原先的替换次数一致)
+    if "「「" in text:
+        text = text.replace("「「", "「").replace("「「", "「")
+    if "」」" in text:
+        text = text.replace("」」", "」").replace("」」", "」")
     return text
 
 def replace_halfwidth_with_fullwidth(string):
@@ -80,17 +93,9 @@ def processQuote(text):
 
 
 def copyfontinfo(ori_font,info_provider,outpath):
-    ori = subprocess.check_output(('otfccdump.exe', '-n', '0', '--hex-cmap', '--no-bom', ori_font)).decode('utf8',errors='ignore')
-    ori = json.loads(ori)
-    infoprov = subprocess.check_output(('otfccdump.exe', '-n', '0', '--hex-cmap', '--no-bom', info_provider)).decode('utf8',errors='ignore')
-    infoprov = json.loads(infoprov)
-
-    ori['name'] = infoprov['name']
-    for i in ori['OS_2']:
-        if type(ori['OS_2'][i]) !=type(1):
-            ori['OS_2'][i] = infoprov['OS_2'][i]
-
-    subprocess.run(['otfccbuild.exe', '-O3', '-o', outpath], input=json.dumps(ori), encoding='utf-8')
+    # 复制 info_provider 的 name 表与 OS/2 描述字段到 ori_font，实现见 font.py (fontTools，不再调用 otfcc)
+    from font import build_font
+    build_font(ori_font, info_provider, outpath)
     
 class OriJsonOutput():
     def __init__(self) -> None:
@@ -115,11 +120,17 @@ class OriJsonOutput():
         except:
             pass
     
-    def save_json(self, path, split = 0):
+    def save_json(self, path, split = 0, balance = False):
+        # balance 为 True 时按 message 字数均分为 split 份 (逐条写出)，否则按条数均分
         if len(self.outlist) == 0:
             return
         if not split:
             save_json(path, self.outlist)
+        elif balance:
+            total = sum(len(i['message']) for i in self.outlist)
+            name = os.path.basename(path)
+            with JsonShardWriter(os.path.dirname(path) or ".", count=split, total=total, name=name + "_{}.json", index_name=name + ".shards.index") as writer:
+                writer.add(os.path.basename(path), self.outlist)
         else:
             l = len(self.outlist) // split
             for i in range(split):
@@ -162,53 +173,260 @@ class OriJsonOutput():
                 namedict[i['name']] = i['name']
         return namedict
     
-class BytesReader(io.BytesIO):
+def estimate_tokens(text):
+    # 粗略估算机翻/大模型的 token 数: 非 ASCII 字符按 1 个计，ASCII 按 4 个字符 1 个计
+    ascii_count = len(text.encode("ascii", "ignore"))
+    return len(text) - ascii_count + (ascii_count + 3) // 4
+
+# 分片的计量方式: 条目 -> 权重
+SHARD_WEIGHTS = {
+    "chars": lambda entry: len(entry.get("message", "")),
+    "tokens": lambda entry: estimate_tokens(entry.get("message", "")),
+}
+
+class JsonListWriter:
+    # 逐条写出 JSON 数组，格式与 save_json (indent=4) 相同，不在内存中保留整个列表
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self.f = open(path, 'w', encoding='utf8')
+        self.f.write("[")
+
+    def write(self, item):
+        text = json.dumps(item, ensure_ascii=False, indent=4).replace("\n", "\n    ")
+        self.f.write(("," if self.count else "") + "\n    " + text)
+        self.count += 1
+
+    def close(self):
+        self.f.write("\n]" if self.count else "]")
+        self.f.close()
+
+class JsonShardWriter:
+    # 把多个脚本的条目按权重 (message 字数或估算 token 数) 连续切分为若干分片
+    # 指定 budget 时每片不超过 budget (单条超出时独占一片)，条目边写边输出
+    # 指定 count 时均分为 count 片: 已知 total (总权重) 时边写边输出，否则先逐条写入临时文件，close() 时按总量切分
+    # close() 时写出索引 (分片 -> 各来源脚本的条目范围)，用于合并回各脚本的 .json
+    # 索引不使用 .json 后缀，不会被 check.py / shard.py 等当作脚本读取
+    INDEX_VERSION = 1
+    SPOOL_NAME = "shards.spool"
+
+    def __init__(self, out_path, budget=None, mode="chars", count=None, total=None, name="shard_{:04d}.json", index_name="shards.index"):
+        if budget is None and count is None:
+            raise ValueError("需要指定 budget 或 count")
+        self.out_path = out_path
+        self.budget = budget
+        self.count = count
+        self.total = total
+        self.done = 0
+        self.mode = mode
+        self.weight = SHARD_WEIGHTS[mode]
+        self.name = name
+        self.index_name = index_name
+        self.shards = []
+        self.sources = {}
+        self.writer = None
+        os.makedirs(out_path, exist_ok=True)
+        self.spool = None
+        if budget is None and total is None:
+            self.total = 0
+            self.spool = open(os.path.join(out_path, self.SPOOL_NAME), 'w', encoding='utf8')
+
+    def _is_full(self, shard, weight):
+        if not shard["count"]:
+            return False
+        if self.budget is not None:
+            return shard["weight"] + weight > self.budget
+        if len(self.shards) >= self.count:
+            return False
+        # 目标为剩余总量 / 剩余分片数，条目超过一半落在目标之外时放入下一片，最后一片收下余量
+        target = (self.total - self.done) / (self.count - len(self.shards) + 1)
+        return shard["weight"] + weight / 2 > target
+
+    def _next_shard(self):
+        self._close_shard()
+        if self.shards:
+            self.done += self.shards[-1]["weight"]
+        file = self.name.format(len(self.shards) + 1)
+        self.writer = JsonListWriter(os.path.join(self.out_path, file))
+        self.shards.append({"file": file, "weight": 0, "count": 0, "sources": []})
+
+    def _close_shard(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def _write(self, source, entry, weight):
+        shard = self.shards[-1] if self.shards else None
+        if shard is None or self._is_full(shard, weight):
+            self._next_shard()
+            shard = self.shards[-1]
+        ranges = shard["sources"]
+        if not ranges or ranges[-1]["source"] != source:
+            ranges.append({"source": source, "start": self.sources[source], "count": 0})
+        ranges[-1]["count"] += 1
+        self.writer.write(entry)
+        shard["weight"] += weight
+        shard["count"] += 1
+        self.sources[source] += 1
+
+    def add(self, source, entries):
+        # source 为来源脚本的 .json 文件名，entries 按原顺序写入 (可以在生成每个脚本后立即调用)
+        if source in self.sources:
+            raise ValueError(f"重复的来源: {source}")
+        self.sources[source] = 0
+        for entry in entries:
+            weight = self.weight(entry)
+            if self.spool is not None:
+                self.spool.write(json.dumps([source, entry], ensure_ascii=False) + "\n")
+                self.total += weight
+            else:
+                self._write(source, entry, weight)
+
+    def _replay_spool(self):
+        # 总量已知后按顺序重放临时文件中的条目
+        spool_path = self.spool.name
+        self.spool.close()
+        self.spool = None
+        with open(spool_path, 'r', encoding='utf8') as f:
+            for line in f:
+                source, entry = json.loads(line)
+                self._write(source, entry, self.weight(entry))
+        os.remove(spool_path)
+
+    def close(self):
+        if self.spool is not None:
+            self._replay_spool()
+        self._close_shard()
+        index = {
+            "version": self.INDEX_VERSION,
+            "mode": self.mode,
+            "budget": self.budget,
+            "count": self.count,
+            "shards": self.shards,
+            "sources": self.sources,
+        }
+        save_json(os.path.join(self.out_path, self.index_name), index)
+        return index
+
+    def discard(self):
+        # 出错时关闭已打开的文件，删除临时文件与已写出的分片，不写索引
+        self._close_shard()
+        if self.spool is not None:
+            self.spool.close()
+            os.remove(self.spool.name)
+            self.spool = None
+        for shard in self.shards:
+            path = os.path.join(self.out_path, shard["file"])
+            if os.path.exists(path):
+                os.remove(path)
+        self.shards = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+class BytesReader:
+    # 基于 memoryview 的只读游标，接口与原先的 io.BytesIO 子类保持一致
+    # 整数用 struct.unpack_from 解码，结束符用 bytes.find 查找，长文本为线性时间
+    U16 = struct.Struct("<H")
+    U32 = struct.Struct("<I")
+
     def __init__(self, data):
-        super().__init__(data)
-        self.length = len(data)
+        self.buf = bytes(data)
+        self.view = memoryview(self.buf)
+        self.length = len(self.buf)
+        self.pos = 0
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self.pos
+        elif whence == 2:
+            offset += self.length
+        if offset < 0:
+            raise ValueError(f"negative seek value {offset}")
+        self.pos = offset
+        return self.pos
+
+    def read(self, size=-1):
+        start = self.pos
+        if size is None or size < 0:
+            end = self.length
+        else:
+            end = min(start + size, self.length)
+        if start >= end:
+            return b""
+        self.pos = end
+        return self.buf[start:end]
+
+    def read_view(self, size):
+        # 零拷贝读取，返回 memoryview
+        start = self.pos
+        self.pos = max(start, min(start + size, self.length))
+        return self.view[start:self.pos]
+
+    def unpack(self, st:struct.Struct):
+        # 按 st 的格式一次读取多个定长值
+        pos = self.pos
+        if pos + st.size > self.length:
+            raise EOFError
+        self.pos = pos + st.size
+        return st.unpack_from(self.buf, pos)
 
     def readU32(self):
-        if self.tell() + 4 > self.length:
+        pos = self.pos
+        if pos + 4 > self.length:
             raise EOFError
-        res = self.read(4)
-        res = from_bytes(res)
-        return res
+        self.pos = pos + 4
+        return self.U32.unpack_from(self.buf, pos)[0]
     
     def readU8(self):
-        res = self.read(1)
-        res = from_bytes(res)
-        return res
+        pos = self.pos
+        if pos >= self.length:
+            return 0
+        self.pos = pos + 1
+        return self.buf[pos]
     
     def readU16(self):
-        res = self.read(2)
-        res = from_bytes(res)
-        return res
+        pos = self.pos
+        if pos + 2 > self.length:
+            return from_bytes(self.read(2))
+        self.pos = pos + 2
+        return self.U16.unpack_from(self.buf, pos)[0]
     
     def is_end(self):
-        if self.tell() >= self.length:
-            return True
+        return self.pos >= self.length
     
     def read_utill_zero(self):
-        out = b""
-        while True:
-            c = self.read(1)
-            if c == b"\x00":
-                break
-            if self.is_end():
-                break
-            out += c
-        return out
+        start = self.pos
+        end = self.buf.find(b"\x00", start)
+        if end == -1:
+            # 没有结束符时读到末尾，与原先逐字节读取的行为一致 (最后一个字节被丢弃)
+            self.pos = max(start, self.length)
+            return self.buf[start:max(start, self.length - 1)]
+        self.pos = end + 1
+        return self.buf[start:end]
     
     def read_utill_zerozero(self):
-        out = b""
-        while True:
-            c = self.read(2)
-            if c == b"\x00\x00":
-                break
-            if self.is_end():
-                break
-            out += c
-        return out
+        # 结束符必须按 2 字节对齐 (UTF-16)
+        buf = self.buf
+        start = self.pos
+        end = buf.find(b"\x00\x00", start)
+        while end != -1 and (end - start) % 2:
+            end = buf.find(b"\x00\x00", end + 1)
+        if end == -1:
+            # 没有结束符时读到末尾，与原先逐 2 字节读取的行为一致 (最后一组被丢弃)
+            self.pos = max(start, self.length)
+            return buf[start:start + max(0, (self.length - start - 1) // 2 * 2)]
+        self.pos = end + 2
+        return buf[start:end]
     
     def read_text_from_offset(self, offset):
         ori_p = self.tell()
@@ -223,8 +441,12 @@ class StatusInfo:
         self.namedict = {}
 
     def update(self, data:OriJsonOutput):
-        self.textCount += data.textcount
-        self.namedict.update(data.get_names())
+        self.update_counts(data.textcount, data.get_names())
+
+    def update_counts(self, textcount, namedict):
+        # 多进程模式下由子进程返回统计结果，父进程按文件顺序合并
+        self.textCount += textcount
+        self.namedict.update(namedict)
     
     def output(self, save_name = False):
         print(f"Text Count: {self.textCount}")
@@ -235,4 +457,34 @@ def split_text(text, max_length):
     res = []
     for i in range(0, len(text), max_length):
         res.append(text[i:i + max_length])
-    return res
\ No newline at end of file
+    return res
+
+def run_captured(func, *args):
+    # 执行 func 并捕获其输出，返回 (结果, stdout 文本, stderr 文本)
+    out, err = io.StringIO(), io.StringIO()
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+        res = func(*args)
+    return res, out.getvalue(), err.getvalue()
+
+def map_jobs(func, tasks, jobs=1):
+    # 依次返回 func(*task) 的结果，顺序与 tasks 一致
+    # jobs > 1 时分发到进程池，子进程的输出被捕获后由父进程按顺序打印，与串行模式一致
+    if jobs <= 1:
+        for task in tasks:
+            yield func(*task)
+        return
+    # 同时最多提交 jobs * 2 个任务，结果取出后即释放，父进程中不会堆积全部结果
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = collections.deque()
+        tasks = iter(tasks)
+        while True:
+            for task in tasks:
+                pending.append(pool.submit(run_captured, func, *task))
+                if len(pending) >= jobs * 2:
+                    break
+            if not pending:
+                return
+            res, out, err = pending.popleft().result()
+            sys.stdout.write(out)
+            sys.stderr.write(err)
+            yield res
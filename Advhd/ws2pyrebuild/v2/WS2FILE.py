@@ -1,5 +1,85 @@
 from Lib import *
 import struct
+import marshal
+import hashlib
+from time import perf_counter_ns
+from bisect import bisect_right
+from collections import namedtuple
+
+U8 = struct.Struct("<B")
+U16 = struct.Struct("<H")
+U32 = struct.Struct("<I")
+
+# 定长参数类型 -> struct 格式 (f 与原实现一致按整数读取)
+FIXED_FORMATS = {"c": "B", "w": "H", "f": "I", "i": "I", "I": "I"}
+FIXED_SIZES = {m: struct.calcsize("<" + fmt) for m, fmt in FIXED_FORMATS.items()}
+
+# 解码计划的步骤类型
+STEP_FIXED = 0   # (STEP_FIXED, struct.Struct, 类型串)    连续的定长参数合并为一次 unpack_from
+STEP_STR = 1     # (STEP_STR, 类型, None)                以 \x00\x00 结尾的字符串
+STEP_LIST = 2    # (STEP_LIST, 类型, struct 格式符|None)  '7': U8 长度 + 若干同类型参数
+STEP_CHOICE = 3  # (STEP_CHOICE, 子计划, None)            'O': U8 长度 + 若干组 "wTcwct"
+
+# 解析结果缓存 (WS2FileCompiler.load_cache)，解析逻辑或存储结构变化时需要修改版本号
+CACHE_DIR = "__ws2cache__"
+CACHE_VERSION = 3
+
+# WS2Command 的参数类型码: 定长类型在前 (与 TYPE_STRUCTS 一一对应)，字符串类型在后
+TYPE_NAMES = ("c", "O", "list", "w", "f", "i", "I", "t", "T")
+TYPE_CODES = {name: code for code, name in enumerate(TYPE_NAMES)}
+TYPE_STRUCTS = (U8, U8, U8, U16, U32, U32, U32)
+TYPE_I = TYPE_CODES["I"]
+TYPE_t = TYPE_CODES["t"]
+TYPE_T = TYPE_CODES["T"]
+
+# iter_ops 产出的指令记录: offset 为指令在文件中的位置，op 为 int，args 为 [(类型, 值), ...]
+WS2Op = namedtuple("WS2Op", ["offset", "op", "args"])
+
+# 按 oplist.json 路径缓存编译好的解码计划，同一进程内只加载一次
+_PLAN_CACHE = {}
+
+def compile_signature(signature):
+    # 将 oplist.json 中的签名串编译为解码计划 (步骤元组)
+    steps = []
+    run = ""
+
+    def flush():
+        nonlocal run
+        if run:
+            fmt = "<" + "".join(FIXED_FORMATS[m] for m in run)
+            steps.append((STEP_FIXED, struct.Struct(fmt), run))
+            run = ""
+
+    i = 0
+    while i < len(signature):
+        m = signature[i]
+        i += 1
+        if m in FIXED_FORMATS:
+            run += m
+        elif m == "t" or m == "T":
+            flush()
+            steps.append((STEP_STR, m, None))
+        elif m == "7":
+            flush()
+            m = signature[i]
+            i += 1
+            steps.append((STEP_LIST, m, FIXED_FORMATS.get(m)))
+        elif m == "O":
+            flush()
+            steps.append((STEP_CHOICE, compile_signature("wTcwct"), None))
+        else:
+            raise ValueError(f"Unknown type {m} in signature {signature}")
+    flush()
+    return tuple(steps)
+
+def load_plans(path="oplist.json"):
+    # 返回 (oplist, {opcode(int): 解码计划})
+    key = os.path.abspath(path)
+    if key not in _PLAN_CACHE:
+        oplist = open_json(path)
+        plans = {int(op, 16): compile_signature(signature) for op, signature in oplist.items()}
+        _PLAN_CACHE[key] = (oplist, plans)
+    return _PLAN_CACHE[key]
 
 class WS2FileDumper:
     def __init__(self, data):
@@ -15,7 +95,7 @@ class WS2FileDumper:
             "O": self.read_O,
         }
         self.data = BytesReader(data)
-        self.oplist = open_json("oplist.json")
+        self.oplist, self.plans = load_plans()
 
     def read_c(self):
         return self.data.readU8()
@@ -44,169 +124,510 @@ class WS2FileDumper:
         length = self.data.readU8()
         return length
 
-    def read_OP(self):
-        res = f"@{self.data.tell()}|"
-        op = self.data.readU8()
-        res += f"#{op:02X}|"
-        op = f"{op:02X}".lower()
-        if op not in self.oplist:
-            print(f"Unknown opcode {op} at {self.data.tell():08X}")
-            # method_name = ""
+    def read_plan(self):
+        # 读取 opcode，返回 (偏移量, opcode, 解码计划)
+        data = self.data
+        offset = data.pos
+        op = data.readU8()
+        plan = self.plans.get(op)
+        if plan is None:
+            print(f"Unknown opcode {op:02x} at {data.pos:08X}")
             raise RuntimeError
-        else:
-            method_name = self.oplist[op]
-        i = 0
-        while i < len(method_name):
-            m = method_name[i]
-            i += 1
-            if m != "7" and m != "O":
-                method = self.methodsDict[m]
-                res += f"{m}::{method()}|"
-            elif m == "O":
-                length = self.read_O()
-                res += f"c::{length}|"
-                method_name = method_name[:i] + "wTcwct" * length + method_name[i:]
+        return offset, op, plan
+
+    def read_args(self):
+        # 读取一条指令，返回 WS2Op(偏移量, opcode, [(类型, 值), ...])，值为 int 或 str
+        # 逐条指令调用的热点路径，直接读取 opcode (与 read_plan 相同)
+        data = self.data
+        offset = data.pos
+        op = data.readU8()
+        plan = self.plans.get(op)
+        if plan is None:
+            print(f"Unknown opcode {op:02x} at {data.pos:08X}")
+            raise RuntimeError
+        args = []
+        try:
+            self.run_plan(plan, args)
+        except struct.error:
+            raise EOFError
+        return WS2Op(offset, op, args)
+
+    def iter_spans(self, ops):
+        # 与 iter_ops(ops) 相同，但同时产出字符串参数的位置: (WS2Op, {参数下标: (起始位置, 结束位置)})
+        data = self.data
+        while not data.is_end():
+            offset, op, plan = self.read_plan()
+            if op in ops:
+                args = []
+                spans = {}
+                try:
+                    self.run_plan(plan, args, spans)
+                except struct.error:
+                    raise EOFError
+                yield WS2Op(offset, op, args), spans
             else:
-                m = method_name[i]
-                i += 1
-                method = self.methodsDict[m]
-                lists = self.read_7(method)
-                res += f"list::{len(lists)}|"
-                for content in lists:
-                    res += f"{m}::{content}|"
-                
-        return res
+                self.skip_plan(plan)
+
+    def iter_ops(self, ops=None):
+        # 逐条产出 WS2Op；ops 为 opcode 集合时只解码其中的指令，其余指令只跳过不解码
+        data = self.data
+        while not data.is_end():
+            if ops is None:
+                yield self.read_args()
+                continue
+            offset, op, plan = self.read_plan()
+            if op in ops:
+                args = []
+                try:
+                    self.run_plan(plan, args)
+                except struct.error:
+                    raise EOFError
+                yield WS2Op(offset, op, args)
+            else:
+                self.skip_plan(plan)
+
+    def skip(self, size):
+        data = self.data
+        if data.pos + size > data.length:
+            raise EOFError
+        data.pos += size
+
+    def skip_plan(self, plan):
+        # 与 run_plan 读取相同的字节数，但不生成参数
+        data = self.data
+        for kind, a, b in plan:
+            if kind == STEP_FIXED:
+                self.skip(a.size)
+            elif kind == STEP_STR:
+                data.read_utill_zerozero()
+            elif kind == STEP_LIST:
+                length = data.readU8()
+                if b is None:
+                    for _ in range(length):
+                        data.read_utill_zerozero()
+                else:
+                    self.skip(FIXED_SIZES[a] * length)
+            else:
+                length = data.readU8()
+                for _ in range(length):
+                    self.skip_plan(a)
+
+    def run_plan(self, plan, args, spans=None):
+        # spans 不为 None 时记录每个字符串参数在文件中的位置 {参数下标: (起始位置, 结束位置)}，结束位置不含结束符
+        data = self.data
+        buf = data.buf
+        append = args.append
+        for kind, a, b in plan:
+            if kind == STEP_FIXED:
+                # a: struct.Struct, b: 类型串
+                pos = data.pos
+                args.extend(zip(b, a.unpack_from(buf, pos)))
+                data.pos = pos + a.size
+            elif kind == STEP_STR:
+                start = data.pos
+                raw = data.read_utill_zerozero()
+                if spans is not None:
+                    spans[len(args)] = (start, start + len(raw))
+                append((a, raw.decode("utf-16-le")))
+            elif kind == STEP_LIST:
+                # a: 元素类型, b: 定长元素的 struct 格式符 (字符串元素为 None)
+                length = data.readU8()
+                append(("list", length))
+                if b is None:
+                    for _ in range(length):
+                        start = data.pos
+                        raw = data.read_utill_zerozero()
+                        if spans is not None:
+                            spans[len(args)] = (start, start + len(raw))
+                        append((a, raw.decode("utf-16-le")))
+                elif length:
+                    args.extend((a, value) for value in data.unpack(struct.Struct(f"<{length}{b}")))
+            else:
+                # a: 子计划
+                length = data.readU8()
+                append(("c", length))
+                for _ in range(length):
+                    self.run_plan(a, args, spans)
+
+    def read_command(self):
+        # 读取一条指令，返回与 WS2FileCompiler 解析结果相同结构的 dict (参数值均为字符串)
+        return op_to_command(self.read_args())
+
+    def read_OP(self):
+        return format_op(self.read_args())
+
+    def iter_commands(self, ops=None):
+        for record in self.iter_ops(ops):
+            yield op_to_command(record)
 
     def dump(self, output_file):
         with open(output_file, "w", encoding="utf-8") as f:
-            while not self.data.is_end():
-                f.write(self.read_OP() + "\n")
+            for record in self.iter_ops():
+                f.write(format_op(record) + "\n")
+
+class WS2FileProfiler(WS2FileDumper):
+    # 统计模式: 与 WS2FileDumper 解码结果相同，额外按 opcode 累计 [指令数, 字节数, 解码耗时 ns] 到 self.stats
+    # 计时有额外开销，只用于比较各指令的占比 (bench.py profile)
+    def __init__(self, data):
+        super().__init__(data)
+        self.stats = {}
+
+    def read_args(self):
+        pos = self.data.pos
+        start = perf_counter_ns()
+        record = super().read_args()
+        cost = perf_counter_ns() - start
+        stat = self.stats.get(record.op)
+        if stat is None:
+            stat = self.stats[record.op] = [0, 0, 0]
+        stat[0] += 1
+        stat[1] += self.data.pos - pos
+        stat[2] += cost
+        return record
+
+def iter_ops(data, ops=None):
+    # 库接口: 按需逐条解码 data (已解密的 .ws2 内容)，例如 iter_ops(data, {0x14, 0x15, 0x0F}) 只解码文本相关指令
+    return WS2FileDumper(data).iter_ops(ops)
+
+def format_op(record):
+    # WS2Op -> 反编译文本的一行
+    offset, op, args = record
+    return f"@{offset}|#{op:02X}|" + "".join([f"{t}::{v}|" for t, v in args])
+
+class WS2Command:
+    # 解析后的一条指令 (大文件有数十万条，不使用 dict)
+    # op 为 int；types 为 bytes，每个参数一个类型码 (TYPE_CODES)；values 为对应的 int 或 str，可直接修改
+    __slots__ = ("ori_offset", "op", "types", "values")
+
+    def __init__(self, ori_offset, op, types, values):
+        self.ori_offset = ori_offset
+        self.op = op
+        self.types = types
+        self.values = values
+
+    def __reduce__(self):
+        # 多进程传递 (pickle) 时按元组保存
+        return (WS2Command, (self.ori_offset, self.op, self.types, self.values))
+
+    def __eq__(self, other):
+        return isinstance(other, WS2Command) and self.__reduce__() == other.__reduce__()
+
+    def __repr__(self):
+        return f"WS2Command({format_command(self)!r})"
+
+    def find(self, code, start=0):
+        # 第一个类型为 code 的参数下标，没有时返回 -1
+        return self.types.find(code, start)
+
+def op_to_command(record):
+    offset, op, args = record
+    return WS2Command(offset, op, bytes(TYPE_CODES[t] for t, _ in args), [v for _, v in args])
+
+def format_command(command):
+    # 格式: @偏移量|#指令|类型::值|...|
+    res = f"@{command.ori_offset}|#{command.op:02X}|"
+    for code, value in zip(command.types, command.values):
+        res += f"{TYPE_NAMES[code]}::{value}|"
+    return res
+
+class WS2FilePatcher(WS2FileDumper):
+    # 二进制补丁: 按解码计划遍历一次，只记录 T 字符串与 I 跳转参数的位置
+    # 替换字符串后用重定位表 (旧位置 -> 新位置) 修正所有跳转，不经过反编译文本
+    def __init__(self, data, encoding="utf-16-le"):
+        super().__init__(data)
+        self.encoding = encoding
+        # (指令偏移量, opcode, 指令内第几个 T, 起始位置, 结束位置 (不含结束符), 文本)
+        self.strings = []
+        # 所有 I 参数所在的位置
+        self.jumps = []
+        # 起始位置 -> (结束位置, 新的字节串)
+        self.replacements = {}
+        self.scan()
+
+    def scan(self):
+        data = self.data
+        while not data.is_end():
+            offset, op, plan = self.read_plan()
+            self.scan_plan(plan, offset, op, [0])
+
+    def scan_plan(self, plan, offset, op, count):
+        # count: [指令内已出现的 T 数量]，'O' 的子计划共用同一个计数
+        data = self.data
+        for kind, a, b in plan:
+            if kind == STEP_FIXED:
+                # a: struct.Struct, b: 类型串
+                pos = data.pos
+                self.skip(a.size)
+                if "I" in b:
+                    for m in b:
+                        if m == "I":
+                            self.jumps.append(pos)
+                        pos += FIXED_SIZES[m]
+            elif kind == STEP_STR:
+                self.scan_str(a, offset, op, count)
+            elif kind == STEP_LIST:
+                length = data.readU8()
+                if b is None:
+                    for _ in range(length):
+                        self.scan_str(a, offset, op, count)
+                else:
+                    pos = data.pos
+                    size = FIXED_SIZES[a]
+                    self.skip(size * length)
+                    if a == "I":
+                        self.jumps.extend(range(pos, pos + size * length, size))
+            else:
+                length = data.readU8()
+                for _ in range(length):
+                    self.scan_plan(a, offset, op, count)
+
+    def scan_str(self, m, offset, op, count):
+        start = self.data.pos
+        raw = self.data.read_utill_zerozero()
+        if m == "T":
+            self.strings.append((offset, op, count[0], start, start + len(raw), raw.decode("utf-16-le")))
+            count[0] += 1
+
+    def replace(self, start, end, text):
+        # 将 [start, end) 替换为 text 的编码，原有的结束符保持不变
+        raw = text.encode(self.encoding)
+        if raw == self.data.buf[start:end]:
+            self.replacements.pop(start, None)
+        else:
+            self.replacements[start] = (end, raw)
+
+    def build(self):
+        # 一次线性拼接生成新文件，同时建立按位置排序的重定位表
+        buf = self.data.buf
+        if not self.replacements:
+            return bytes(buf)
+        out = bytearray()
+        ends = []
+        shifts = []
+        pos = 0
+        shift = 0
+        for start in sorted(self.replacements):
+            end, raw = self.replacements[start]
+            out += buf[pos:start]
+            out += raw
+            pos = end
+            shift += len(raw) - (end - start)
+            ends.append(end)
+            shifts.append(shift)
+        out += buf[pos:]
+
+        def relocate(old):
+            # 结束位置 <= old 的替换都会使 old 之后的内容整体移动
+            k = bisect_right(ends, old)
+            return old + shifts[k - 1] if k else old
+
+        for pos in self.jumps:
+            U32.pack_into(out, relocate(pos), relocate(U32.unpack_from(buf, pos)[0]))
+        return bytes(out)
 
 class WS2FileCompiler:
-    def __init__(self, path, encoding):
-            self.path = path
-            self.encoding = encoding
+    def __init__(self, path, encoding, cache=False):
+        self.path = path
+        self.encoding = encoding
+        self.output = None
+
+        # cache=True 时优先读取解析结果缓存 (见 load_cache)，文本被修改后自动失效
+        if cache:
+            self.load_cache()
+            return
+
+        # 逐行读取解析，不保留原始文本
+        with open(path, "r", encoding="utf-8") as f:
+            self.parse_lines(f)
+
+    def parse_lines(self, lines):
+        # 不符合 @偏移量|#指令 格式的行只警告并跳过 (记入 skipped_lines，此时不写缓存，下次仍会警告)
+        # 参数无法解析 (定长参数不是整数、未知类型) 时直接报错: 跳过该行会使编译结果的偏移错位
+        self.commands = []
+        self.skipped_lines = 0
+        for line in lines:
+            line = line.strip()
             
-            # 读取文件并进行初步清理
-            with open(path, "r", encoding="utf-8") as f:
-                self.lines = f.readlines()
+            # 过滤掉空行和注释行
+            if not line or line.startswith("//"):
+                continue
+                
+            # 分割数据块
+            # 格式预期: @偏移量|#指令|类型::值|...|
+            contents = line.split("|")
             
-            self.commands = []
-            for line in self.lines:
-                line = line.strip()
+            # 基础格式校验：确保至少包含偏移量和指令码
+            if len(contents) < 2 or not contents[0].startswith("@"):
+                continue
+
+            try:
+                # 解析原始偏移量 (去除开头的 '@')
+                ori_offset = int(contents[0][1:])
                 
-                # 过滤掉空行和注释行
-                if not line or line.startswith("//"):
-                    continue
-                    
-                # 分割数据块
-                # 格式预期: @偏移量|#指令|类型::值|...|
-                contents = line.split("|")
+                # 解析 Opcode (去除开头的 '#')
+                op = int(contents[1][1:], 16)
+            except ValueError as e:
+                # 记录报错行但不中断程序
+                print(f"警告: 无法解析行 '{line}'，错误: {e}")
+                self.skipped_lines += 1
+                continue
                 
-                # 基础格式校验：确保至少包含偏移量和指令码
-                if len(contents) < 2 or not contents[0].startswith("@"):
-                    continue
+            # 处理参数部分
+            # contents[2:] 是参数列表，最后一个通常是分割产生的空字符串
+            types = bytearray()
+            values = []
+            for c in contents[2:]:
+                if "::" in c:
+                    t, v = c.split("::", 1) # 仅分割第一个 '::' 避免值内冲突
+                    code = TYPE_CODES.get(t)
+                    if code is None:
+                        raise ValueError(f"无法解析行 '{line}'，未知类型 {t}")
+                    types.append(code)
+                    # 定长参数直接保存为整数
+                    if code < TYPE_t:
+                        try:
+                            v = int(v)
+                        except ValueError:
+                            raise ValueError(f"无法解析行 '{line}'，{t} 参数不是整数: {v}") from None
+                    values.append(v)
+            
+            self.commands.append(WS2Command(ori_offset, op, bytes(types), values))
 
-                try:
-                    line_content = {}
-                    # 解析原始偏移量 (去除开头的 '@')
-                    line_content["ori_offset"] = int(contents[0][1:])
-                    
-                    # 解析 Opcode (去除开头的 '#')
-                    line_content["op"] = contents[1][1:]
-                    
-                    # 处理参数部分
-                    # contents[2:] 是参数列表，最后一个通常是分割产生的空字符串
-                    args_part = contents[2:]
-                    args = []
-                    for c in args_part:
-                        if "::" in c:
-                            arg = {}
-                            t, v = c.split("::", 1) # 仅分割第一个 '::' 避免值内冲突
-                            arg["type"] = t
-                            arg["value"] = v
-                            args.append(arg)
-                    
-                    line_content["args"] = args
-                    self.commands.append(line_content)
-                    
-                except (ValueError, IndexError) as e:
-                    # 记录报错行但不中断程序
-                    print(f"警告: 无法解析行 '{line}'，错误: {e}")
-                    continue
+    def get_cache_path(self):
+        # 缓存放在文本所在文件夹的 __ws2cache__ 子目录中
+        folder, name = os.path.split(self.path)
+        return os.path.join(folder, CACHE_DIR, name + ".cache")
+
+    def load_cache(self):
+        # 缓存以文本的 mtime/大小 及内容哈希为键:
+        # mtime 与大小一致时直接命中；不一致时比较内容哈希 (仅被 touch 的文件仍可命中)，否则重新解析并更新缓存
+        stat = os.stat(self.path)
+        cache_path = self.get_cache_path()
+        try:
+            cached = self.read_cache(cache_path)
+        except Exception:
+            cached = None
+
+        if cached and cached["mtime_ns"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+            self.commands = cached["commands"]
+            return
+
+        raw = open_file_b(self.path)
+        digest = hashlib.blake2b(raw).hexdigest()
+        if cached and cached["digest"] == digest:
+            self.commands = cached["commands"]
+        else:
+            # 与文本模式读取一致 (universal newlines)
+            self.parse_lines(io.StringIO(raw.decode("utf-8"), newline=None))
+            if self.skipped_lines:
+                return
+        del raw
+
+        self.save_cache(cache_path, stat, digest, self.commands)
+
+    @staticmethod
+    def read_cache(cache_path):
+        # 缓存只保存纯数据 (marshal 格式的元组/列表/整数/字符串/bytes)，读取时重新构造 WS2Command
+        # 反编译文件夹会在译者之间传递，不使用 pickle (加载时可执行任意代码)；结构不符时返回 None
+        # 一次读入后再解码 (marshal.load 直接读文件对象时非常慢)
+        with open(cache_path, "rb") as f:
+            version, mtime_ns, size, digest, commands = marshal.loads(f.read())
+        if version != CACHE_VERSION:
+            return None
+        res = []
+        for ori_offset, op, types, values in commands:
+            if type(ori_offset) is not int or type(op) is not int or type(types) is not bytes \
+                    or type(values) is not list or len(values) != len(types):
+                return None
+            res.append(WS2Command(ori_offset, op, types, values))
+        return {"mtime_ns": mtime_ns, "size": size, "digest": digest, "commands": res}
+
+    @staticmethod
+    def save_cache(cache_path, stat, digest, commands):
+        # 缓存写入失败 (如只读目录) 不影响正常流程
+        cached = (CACHE_VERSION, stat.st_mtime_ns, stat.st_size, digest,
+                  [(c.ori_offset, c.op, c.types, c.values) for c in commands])
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(cache_path + ".tmp", "wb") as f:
+                f.write(marshal.dumps(cached))
+            os.replace(cache_path + ".tmp", cache_path)
+        except OSError:
+            pass
     
     def preCompile(self):
-        # 计算新的offset
+        # 单次遍历完成布局: 每个字符串只编码一次，写入预分配的 bytearray
+        # I 类型的跳转参数先写入占位并记录位置，布局确定后再统一回填新的 offset
         self.offsetdict = {}
-        offset = 0
+        out = bytearray()
+        fixups = []
+        to_gbk = self.encoding == "936"
+        end_char = b"\x00\x00" if "16" in self.encoding else b"\x00"
         for c in self.commands:
-            ori_offset = c["ori_offset"]
-            new_offset = offset
-            self.offsetdict[ori_offset] = new_offset
-            offset += 1
-            for arg in c["args"]:
-                match arg["type"]:
-                    case "list":
-                        offset += 1
-                    case "O":
-                        offset += 1
-                    case "c":
-                        offset += 1
-                    case "w":
-                        offset += 2
-                    case "f":
-                        offset += 4
-                    case "i":
-                        offset += 4
-                    case "I":
-                        offset += 4
-                    case "t":
-                        v = arg["value"]
-                        if self.encoding == "936":
-                            v = replace_symbol_for_gbk(v)
-                        end_len = 1
-                        if "16" in self.encoding:
-                            end_len = 2
-                        offset += len(v.encode(self.encoding)) + end_len
-                    case "T":
-                        v = arg["value"]
-                        if self.encoding == "936":
-                            v = replace_symbol_for_gbk(v)
-                        end_len = 1
-                        if "16" in self.encoding:
-                            end_len = 2
-                        offset += len(v.encode(self.encoding)) + end_len
-                    case _:
-                        raise ValueError(f"Unknown type {arg['type']} in command {c}")
-    
+            self.offsetdict[c.ori_offset] = len(out)
+            out.append(c.op)
+            for code, v in zip(c.types, c.values):
+                if code == TYPE_I:
+                    fixups.append((len(out), v))
+                    out += b"\x00\x00\x00\x00"
+                elif code < TYPE_t:
+                    out += TYPE_STRUCTS[code].pack(v)
+                else:
+                    if to_gbk:
+                        v = replace_symbol_for_gbk(v)
+                    out += v.encode(self.encoding)
+                    out += end_char
+
+        for pos, ori_offset in fixups:
+            U32.pack_into(out, pos, self.offsetdict[ori_offset])
+        self.output = out
+        return out
+
+    def find_unencodable(self):
+        # 编译前检查: 返回 [(偏移量, 无法编码的字符, 文本)]，与 preCompile 使用相同的 GBK 规范化
+        to_gbk = self.encoding == "936"
+        texts = []
+        for c in self.commands:
+            for code, v in zip(c.types, c.values):
+                if code >= TYPE_t:
+                    texts.append((c.ori_offset, replace_symbol_for_gbk(v) if to_gbk else v))
+        # 整个文件一次编码，全部可编码时直接返回
+        try:
+            "\x00".join(v for _, v in texts).encode(self.encoding)
+            return []
+        except UnicodeEncodeError:
+            pass
+
+        res = []
+        encodable = {}
+        for offset, v in texts:
+            try:
+                v.encode(self.encoding)
+                continue
+            except UnicodeEncodeError:
+                pass
+            bad = []
+            for ch in dict.fromkeys(v):
+                if ch not in encodable:
+                    try:
+                        ch.encode(self.encoding)
+                        encodable[ch] = True
+                    except UnicodeEncodeError:
+                        encodable[ch] = False
+                if not encodable[ch]:
+                    bad.append(ch)
+            res.append((offset, "".join(bad), v))
+        return res
+
+    def compile_bytes(self):
+        # 返回编译结果，紧接在 preCompile 之后调用时直接取用其结果，不再重复编译
+        output = getattr(self, "output", None)
+        if output is None:
+            output = self.preCompile()
+        self.output = None
+        return bytes(output)
+
     def compile(self, outpath):
+        data = self.compile_bytes()
         with open(outpath, "wb") as f:
-            for c in self.commands:
-                f.write(bytes.fromhex(c["op"]))
-                for arg in c["args"]:
-                    match arg["type"]:
-                        case "c":
-                            f.write(to_bytes(int(arg["value"]), 1))
-                        case "w":
-                            f.write(to_bytes(int(arg["value"]), 2))
-                        case "f":
-                            f.write(to_bytes(int(arg["value"]), 4))
-                        case "i":
-                            f.write(to_bytes(int(arg["value"]), 4))
-                        case "I":
-                            new_value = self.offsetdict[int(arg["value"])]
-                            f.write(to_bytes(new_value, 4))
-                        case "t" | "T":
-                            v = arg["value"]
-                            if self.encoding == "936":
-                                v = replace_symbol_for_gbk(v)
-                            end_char = b"\x00"
-                            if "16" in self.encoding:
-                                end_char = b"\x00\x00"
-                            f.write(v.encode(self.encoding) + end_char)
-                        case "O":
-                            f.write(to_bytes(int(arg["value"]), 1))
-                        case "list":
-                            f.write(to_bytes(int(arg["value"]), 1))
-                        case _:
-                            raise ValueError(f"Unknown type {arg['type']} in command {c}")
+            f.write(data)
@@ -3,107 +3,323 @@ import struct
 import argparse
 import textwrap
 import sys
-
-# 加密/解密算法
-# Encrypt: (b << 2) | (b >> 6)  -> 循环左移 2 位
-# Decrypt: (b << 6) | (b >> 2)  -> 循环右移 2 位 (即左移6位)
-
-def rotate_left_2(data: bytes) -> bytes:
-    # 加密: 循环左移 2 位
-    res = bytearray(data)
-    for i in range(len(res)):
-        val = res[i]
-        res[i] = ((val << 2) & 0xFF) | (val >> 6)
-    return bytes(res)
-
-def rotate_right_2(data: bytes) -> bytes:
-    # 解密: 循环右移 2 位 (等同于 (data[i] << 6) | (data[i] >> 2))
-    res = bytearray(data)
-    for i in range(len(res)):
-        val = res[i]
-        res[i] = ((val << 6) & 0xFF) | (val >> 2)
-    return bytes(res)
+import shutil
+import mmap
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from ws2codec import *
 
 class ArcEntry:
     def __init__(self):
         self.name = ""
         self.size = 0
         self.offset = 0
+        self.index_pos = 0
+
+def find_zerozero(buf, start, end):
+    # 查找 start 之后按 2 字节对齐的 b'\x00\x00' (UTF-16 结束符)，找不到返回 -1
+    pos = buf.find(b'\x00\x00', start, end)
+    while pos != -1 and (pos - start) % 2:
+        pos = buf.find(b'\x00\x00', pos + 1, end)
+    return pos
+
+def pwrite_all(fd, data, offset):
+    # 按位置写入全部数据，不依赖也不改变文件指针 (Windows 没有 os.pwrite，退回 lseek + write)
+    data = memoryview(data)
+    while data:
+        if hasattr(os, 'pwrite'):
+            written = os.pwrite(fd, data, offset)
+        else:
+            os.lseek(fd, offset, os.SEEK_SET)
+            written = os.write(fd, data)
+        data = data[written:]
+        offset += written
+
+class Progress:
+    # 批量输出进度，避免逐条打印
+    def __init__(self, total, label, step=None):
+        self.total = total
+        self.label = label
+        self.count = 0
+        self.step = step or max(1, total // 20)
+
+    def update(self, n=1):
+        last = self.count
+        self.count += n
+        if self.count // self.step != last // self.step or self.count == self.total:
+            print(f"  -> {self.label}: {self.count}/{self.total} ({self.count * 100 / self.total:.1f}%)")
+
+class ArcReader:
+    # 以内存映射方式打开 .arc，一次性解析索引块，按文件名随机读取
+    # 注意: open() 返回的 memoryview 在 close() 前需要全部释放
+    def __init__(self, arc_path):
+        self.path = arc_path
+        self._file = open(arc_path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"无效的 .arc 文件: {arc_path}")
+        self._view = memoryview(self._mm)
+        try:
+            self.entries = self._parse_index()
+        except Exception:
+            self.close()
+            raise
+        self._index = {entry.name: entry for entry in self.entries}
+
+    def _parse_index(self):
+        mm = self._mm
+        if len(mm) < 8:
+            raise ValueError("文件过小，不是有效的 .arc 文件...")
+        file_count, index_size = struct.unpack_from('<II', mm, 0)
+        base_offset = 8 + index_size
+        if base_offset > len(mm):
+            raise ValueError("索引读取超出边界...")
+        self.index_size = index_size
+        self.base_offset = base_offset
+
+        # 一次性读出整个索引块
+        index = mm[8:base_offset]
+        entries = []
+        pos = 0
+        for _ in range(file_count):
+            if pos + 8 > index_size:
+                raise ValueError("索引读取超出边界...")
+            entry = ArcEntry()
+            entry.size, raw_offset = struct.unpack_from('<II', index, pos)
+            entry.offset = base_offset + raw_offset
+            entry.index_pos = 8 + pos
+            pos += 8
+
+            name_end = find_zerozero(index, pos, index_size)
+            if name_end == -1:
+                raise ValueError("索引读取超出边界...")
+            entry.name = index[pos:name_end].decode('utf-16-le')
+            pos = name_end + 2
+
+            if entry.offset + entry.size > len(mm):
+                raise ValueError(f"文件数据超出边界: {entry.name}")
+            entries.append(entry)
+        return entries
+
+    def list(self):
+        return [entry.name for entry in self.entries]
+
+    def get_entry(self, name):
+        if name not in self._index:
+            raise KeyError(f"找不到文件: {name}")
+        return self._index[name]
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __len__(self):
+        return len(self.entries)
+
+    def open(self, name):
+        # 零拷贝，直接返回映射内存上的 memoryview
+        entry = self.get_entry(name)
+        return self._view[entry.offset:entry.offset + entry.size]
+
+    def read(self, name, decrypt=False):
+        with self.open(name) as view:
+            if decrypt and name.lower().endswith('.ws2'):
+                return rotate_right_2(view)
+            return bytes(view)
+
+    def extract(self, names=None, output_dir=".", decrypt=False, jobs=1, progress=None):
+        # names 为 None 时提取全部文件，decrypt 只对 .ws2 生效，返回提取的文件数
+        # jobs > 1 时由线程池并行提取 (各线程共享同一份映射，按位置写入互不干扰)
+        if names is None:
+            names = self.list()
+        entries = [self.get_entry(name) for name in names]
+
+        # 预先创建好所有目录，避免工作线程重复创建
+        for out_dir in {os.path.dirname(os.path.join(output_dir, entry.name)) for entry in entries}:
+            os.makedirs(out_dir, exist_ok=True)
+
+        if jobs <= 1:
+            for entry in entries:
+                self._extract_entry(entry, output_dir, decrypt)
+                if progress:
+                    progress.update()
+        else:
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                futures = [pool.submit(self._extract_entry, entry, output_dir, decrypt) for entry in entries]
+                for future in as_completed(futures):
+                    future.result()
+                    if progress:
+                        progress.update()
+        return len(entries)
+
+    def _extract_entry(self, entry, output_dir, decrypt):
+        # 分块从映射内存读取，(解密后) 按位置写入目标文件
+        out_path = os.path.join(output_dir, entry.name)
+        do_decrypt = decrypt and entry.name.lower().endswith('.ws2')
+        fd = os.open(out_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o666)
+        try:
+            for pos in range(0, entry.size, CHUNK_SIZE):
+                chunk = self._view[entry.offset + pos:entry.offset + min(pos + CHUNK_SIZE, entry.size)]
+                if do_decrypt:
+                    chunk = rotate_right_2(chunk)
+                pwrite_all(fd, chunk, pos)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        if self._mm is None:
+            return
+        self._view.release()
+        self._mm.close()
+        self._file.close()
+        self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+class ArcVFS:
+    # 按优先级挂载多个 .arc (Rio1.arc、Rio2.arc、补丁封包...)，合并为一份 文件名 -> (封包, 条目) 的索引
+    # 后挂载的封包优先，同名文件覆盖先挂载的 (与游戏加载补丁封包的顺序一致)；文件名不区分大小写
+    # 只解析各封包的索引块，文件内容在 open() / read() 时才从对应封包的映射内存读取
+    def __init__(self, arc_paths=()):
+        self.readers = []
+        self._index = {}
+        try:
+            for arc_path in arc_paths:
+                self.mount(arc_path)
+        except Exception:
+            self.close()
+            raise
+
+    def mount(self, arc_path):
+        reader = ArcReader(arc_path)
+        self.readers.append(reader)
+        for entry in reader.entries:
+            self._index[entry.name.lower()] = (reader, entry)
+        return reader
+
+    def lookup(self, name):
+        # 返回 (ArcReader, ArcEntry)，即文件所在的封包及其偏移/大小
+        res = self._index.get(name.lower())
+        if res is None:
+            raise KeyError(f"找不到文件: {name}")
+        return res
+
+    def list(self):
+        return [entry.name for _, entry in self._index.values()]
+
+    def get_entry(self, name):
+        return self.lookup(name)[1]
+
+    def source(self, name):
+        return self.lookup(name)[0].path
+
+    def __contains__(self, name):
+        return name.lower() in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def open(self, name):
+        reader, entry = self.lookup(name)
+        return reader.open(entry.name)
+
+    def read(self, name, decrypt=False):
+        reader, entry = self.lookup(name)
+        return reader.read(entry.name, decrypt)
+
+    def extract(self, names=None, output_dir=".", decrypt=False, jobs=1, progress=None):
+        # 按所在封包分组后交给各 ArcReader 提取，返回提取的文件数
+        if names is None:
+            names = self.list()
+        groups = {}
+        for name in names:
+            reader, entry = self.lookup(name)
+            groups.setdefault(id(reader), (reader, []))[1].append(entry.name)
+        return sum(reader.extract(group, output_dir, decrypt, jobs, progress) for reader, group in groups.values())
+
+    def close(self):
+        for reader in self.readers:
+            reader.close()
+        self.readers = []
+        self._index = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
 class ArcManager:
     @staticmethod
-    def unpack(arc_path, output_dir, do_decrypt=False):
+    def unpack(arc_path, output_dir, do_decrypt=False, names=None, jobs=1):
+        # arc_path 可以是多个 .arc 的列表，按 ArcVFS 合并后提取 (后面的封包优先)
+        arc_paths = [arc_path] if isinstance(arc_path, str) else list(arc_path)
         print(f"\n>> Command: Unpack")
-        print(f"   输入: {arc_path}")
+        print(f"   输入: {' + '.join(arc_paths)}")
         print(f"   输出: {output_dir}")
         print(f"   解密: {'是' if do_decrypt else '否'}")
 
-        if not os.path.exists(arc_path):
-            print(f"[ERROR] 找不到输入文件: {arc_path}")
-            return
+        for path in arc_paths:
+            if not os.path.exists(path):
+                print(f"[ERROR] 找不到输入文件: {path}")
+                return
 
         os.makedirs(output_dir, exist_ok=True)
 
-        with open(arc_path, 'rb') as f:
-            # 读取头部
-            file_count = struct.unpack('<I', f.read(4))[0]
-            index_size = struct.unpack('<I', f.read(4))[0]
-            base_offset = 8 + index_size
-            
-            print(f"[INFO] 发现 {file_count} 个文件，索引大小 {index_size} 字节。")
-            
-            entries = []
-            
-            # 读取索引
-            index_end_pos = 8 + index_size
-            
-            for _ in range(file_count):
-                if f.tell() >= index_end_pos:
-                    raise ValueError("索引读取超出边界...")
-                
-                entry = ArcEntry()
-                entry.size = struct.unpack('<I', f.read(4))[0]
-                raw_offset = struct.unpack('<I', f.read(4))[0]
-                entry.offset = base_offset + raw_offset
-                
-                # 读取文件名
-                name_bytes = bytearray()
-                while True:
-                    char_bytes = f.read(2)
-                    if not char_bytes or char_bytes == b'\x00\x00':
-                        break
-                    name_bytes.extend(char_bytes)
-                
-                entry.name = name_bytes.decode('utf-16-le')
-                entries.append(entry)
+        with ArcVFS(arc_paths) as reader:
+            for arc in reader.readers:
+                print(f"[INFO] {arc.path}: 发现 {len(arc)} 个文件，索引大小 {arc.index_size} 字节。")
+            if len(arc_paths) > 1:
+                print(f"[INFO] 合并后共 {len(reader)} 个文件。")
+
+            if names is None:
+                names = reader.list()
+            else:
+                missing = [name for name in names if name not in reader]
+                for name in missing:
+                    print(f"[WARNNING] 找不到文件: {name}")
+                names = [name for name in names if name in reader]
 
             # 提取文件
-            print(">>开始提取文件")
-            for entry in entries:
-                print(f"  -> 提取中: {entry.name}", end="")
-                
-                f.seek(entry.offset)
-                data = f.read(entry.size)
-                
-                # 解密逻辑
-                if do_decrypt and entry.name.lower().endswith('.ws2'):
-                    print(" (解密中)", end="")
-                    data = rotate_right_2(data)
-                
-                # 写入文件
-                out_path = os.path.join(output_dir, entry.name)
-                os.makedirs(os.path.dirname(out_path), exist_ok=True)
-                
-                with open(out_path, 'wb') as out_f:
-                    out_f.write(data)
-                print(" ...完成")
+            print(f">>开始提取文件{f' (并行: {jobs})' if jobs > 1 else ''}")
+            progress = Progress(len(names), "已提取")
+            reader.extract(names, output_dir, do_decrypt, jobs, progress)
+            print(f">>提取完成，共 {progress.count} 个文件")
 
     @staticmethod
-    def pack(input_dir, arc_path, do_encrypt=False):
+    def list_files(arc_paths, names=None):
+        # 列出合并后的文件及其所在封包
+        print(f"\n>> Command: List")
+        print(f"   输入: {' + '.join(arc_paths)}")
+
+        for path in arc_paths:
+            if not os.path.exists(path):
+                print(f"[ERROR] 找不到输入文件: {path}")
+                return
+
+        with ArcVFS(arc_paths) as vfs:
+            for name in names if names is not None else vfs.list():
+                if name not in vfs:
+                    print(f"[WARNNING] 找不到文件: {name}")
+                    continue
+                reader, entry = vfs.lookup(name)
+                print(f"  {entry.name}\t{entry.size}\t{reader.path}")
+            print(f">>共 {len(vfs)} 个文件 (来自 {len(vfs.readers)} 个封包)")
+
+    @staticmethod
+    def pack(input_dir, arc_path, do_encrypt=False, base_path=None):
         print(f"\n>> Command: Pack")
         print(f"   输入: {input_dir}")
         print(f"   输出: {arc_path}")
         print(f"   加密: {'是' if do_encrypt else '否'}")
+        if base_path:
+            print(f"   增量: {base_path}")
 
         files_to_pack = []
         if os.path.exists(input_dir):
@@ -140,51 +356,168 @@ class ArcManager:
         base_offset = 8 + index_size
         current_data_offset = 0
 
-        with open(arc_path, 'wb') as f:
-            # 写入数据
-            f.seek(base_offset)
-            print(">>开始写入文件数据")
-            for entry in entries:
-                print(f"  -> 打包中: {entry.name}", end="")
+        # 增量模式: 来源文件的大小/内容哈希/加密方式与旧封包的打包清单一致时，直接从旧封包中整块复制，不重新加密
+        base = None
+        base_records = {}
+        if base_path:
+            if not os.path.exists(base_path):
+                print(f"[WARNNING] 找不到旧封包: {base_path}，将完整打包。")
+            else:
+                base_records = load_pack_manifest(base_path)
+                if base_records is None:
+                    print(f"[WARNNING] 旧封包没有可用的打包清单 ({get_pack_manifest_path(base_path)})，将完整打包。")
+                else:
+                    base = ArcReader(base_path)
+
+        # 输出路径与旧封包相同时先写入临时文件
+        out_path = arc_path
+        if base and os.path.abspath(base_path) == os.path.abspath(arc_path):
+            out_path = arc_path + ".tmp"
+
+        reused = 0
+        records = {}
+        try:
+            with open(out_path, 'wb') as f:
+                # 写入数据
+                f.seek(base_offset)
+                print(">>开始写入文件数据")
+                for entry in entries:
+                    print(f"  -> 打包中: {entry.name}", end="")
+                    
+                    entry.offset = current_data_offset
+                    mode = 'enc' if do_encrypt and entry.name.lower().endswith('.ws2') else None
+                    records[entry.name] = {"size": os.path.getsize(entry.path), "digest": digest_file(entry.path), "mode": mode or ""}
+                    if base and ArcManager.is_unchanged(base, base_records, entry, records[entry.name]):
+                        print(" (复用)", end="")
+                        with base.open(entry.name) as view:
+                            f.write(view)
+                            entry.size = len(view)
+                        reused += 1
+                    else:
+                        with open(entry.path, 'rb') as in_f:
+                            if mode:
+                                print(" (加密中)", end="")
+                                entry.size = process_stream(in_f, f, mode)
+                            else:
+                                shutil.copyfileobj(in_f, f, CHUNK_SIZE)
+                                entry.size = in_f.tell()
+                    
+                    current_data_offset += entry.size
+                    print(" ...完成")
                 
-                with open(entry.path, 'rb') as in_f:
-                    data = in_f.read()
+                # 写入索引
+                print(">>开始写入索引")
+                f.seek(0)
+                f.write(struct.pack('<I', len(entries)))
+                f.write(struct.pack('<I', index_size))
                 
+                for entry in entries:
+                    f.write(struct.pack('<I', entry.size))
+                    f.write(struct.pack('<I', entry.offset))
+                    f.write(entry.name.encode('utf-16-le'))
+                    f.write(b'\x00\x00')
+        except BaseException:
+            if out_path != arc_path and os.path.exists(out_path):
+                os.remove(out_path)
+            raise
+        finally:
+            if base:
+                base.close()
+
+        if out_path != arc_path:
+            os.replace(out_path, arc_path)
+        save_pack_manifest(arc_path, records)
+        if base:
+            print(f">>增量打包完成: 复用 {reused} 个，重新写入 {len(entries) - reused} 个")
+
+    @staticmethod
+    def is_unchanged(base, base_records, entry, record):
+        # 比较打包清单中的来源文件信息 (含内容哈希，保留修改时间的复制/解压也能发现改动)，另外确认旧封包中的大小一致 (加密不改变大小)
+        if entry.name not in base or base_records.get(entry.name) != record:
+            return False
+        return base.get_entry(entry.name).size == record["size"]
+
+    @staticmethod
+    def update_entries(arc_path, files, do_encrypt=False):
+        # 直接改写 .arc 中的若干文件，files 为 {文件名: 数据}，返回更新的文件数
+        # 新数据不大于原数据时写回原位置，否则追加到封包末尾 (原数据成为空洞，下次完整打包时清除)
+        # 只修改索引中对应条目的大小/偏移，封包中不存在的文件需要完整打包
+        with ArcReader(arc_path) as reader:
+            base_offset = reader.base_offset
+            end = os.path.getsize(arc_path)
+            targets = []
+            for name, data in files.items():
+                if name not in reader:
+                    print(f"[WARNNING] 封包中没有 {name}，需要完整打包才能加入新文件。")
+                    continue
+                targets.append((reader.get_entry(name), data))
+
+        # 改写前读取打包清单 (改写后封包的大小/修改时间变化，清单会失效)
+        records = load_pack_manifest(arc_path)
+        appended = 0
+        with open(arc_path, 'r+b') as f:
+            for entry, data in targets:
                 if do_encrypt and entry.name.lower().endswith('.ws2'):
-                    print(" (加密中)", end="")
                     data = rotate_left_2(data)
-                
-                entry.offset = current_data_offset
-                entry.size = len(data)
-                
+                if len(data) <= entry.size:
+                    offset = entry.offset
+                else:
+                    offset = end
+                    end += len(data)
+                    appended += 1
+                f.seek(offset)
                 f.write(data)
-                current_data_offset += len(data)
-                print(" ...完成")
-            
-            # 写入索引
-            print(">>开始写入索引")
-            f.seek(0)
-            f.write(struct.pack('<I', len(entries)))
-            f.write(struct.pack('<I', index_size))
-            
-            for entry in entries:
-                f.write(struct.pack('<I', entry.size))
-                f.write(struct.pack('<I', entry.offset))
-                f.write(entry.name.encode('utf-16-le'))
-                f.write(b'\x00\x00')
+                f.seek(entry.index_pos)
+                f.write(struct.pack('<II', len(data), offset - base_offset))
+        if appended:
+            print(f"[INFO] {appended} 个文件变大，已追加到封包末尾。")
+
+        # 打包清单中去掉被改写的文件 (下次增量打包时重新读取)，其余记录继续有效
+        if records is not None:
+            for entry, _ in targets:
+                records.pop(entry.name, None)
+            save_pack_manifest(arc_path, records)
+        return len(targets)
+
+# 打包清单版本号，记录格式变化时需要修改
+PACK_MANIFEST_VERSION = 2
+
+def get_pack_manifest_path(arc_path):
+    # 打包清单放在 .arc 旁边，记录每个文件的来源信息，供下次增量打包 (-b) 判断能否复用
+    return arc_path + ".manifest.json"
+
+def get_arc_stat(arc_path):
+    st = os.stat(arc_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+def save_pack_manifest(arc_path, records):
+    # records: {文件名: {"size": 来源大小, "digest": 来源内容哈希, "mode": 加密方式}}
+    manifest = {"version": PACK_MANIFEST_VERSION, "arc": get_arc_stat(arc_path), "files": records}
+    with open(get_pack_manifest_path(arc_path), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=4)
+
+def digest_file(path):
+    # 分块计算来源文件内容的哈希 (只读取，不加密)
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def load_pack_manifest(arc_path):
+    # 返回文件记录；清单不存在、版本不符或封包已被其他程序修改时返回 None
+    try:
+        with open(get_pack_manifest_path(arc_path), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != PACK_MANIFEST_VERSION or manifest.get("arc") != get_arc_stat(arc_path):
+        return None
+    return manifest.get("files", {})
 
 def process_enc_dec_file(path, output_path, mode):
     print(f"  -> Processing: {os.path.basename(path)}")
-    with open(path, 'rb') as f:
-        data = f.read()
-    
-    if mode == 'enc':
-        data = rotate_left_2(data)
-    else:
-        data = rotate_right_2(data)
-        
-    with open(output_path, 'wb') as f:
-        f.write(data)
+    process_file(path, output_path, 'enc' if mode == 'enc' else 'dec')
 
 def batch_process_enc_dec(input_path, output_path, mode):
     print(f"\n>> Command: {'Enc' if mode=='enc' else 'Dec'}")
@@ -233,15 +566,23 @@ if __name__ == "__main__":
 
     # Unpack
     p_unpack = subparsers.add_parser('unpack', help='解包 .arc 文件')
-    p_unpack.add_argument('-i', '--input', default=None, help='输入 .arc 文件路径')
+    p_unpack.add_argument('-i', '--input', nargs='+', default=None, help='输入 .arc 文件路径，可指定多个 (按顺序合并，后面的优先)')
     p_unpack.add_argument('-o', '--output', default=None, help='输出文件夹路径')
     p_unpack.add_argument('-dec', '--decrypt', action='store_true', help='同时解密 .ws2 文件')
+    p_unpack.add_argument('-n', '--names', nargs='+', default=None, help='只提取指定的文件 (默认全部)')
+    p_unpack.add_argument('-j', '--jobs', type=int, default=1, help='并行提取的线程数 (默认 1)')
+
+    # List
+    p_list = subparsers.add_parser('list', help='列出 (多个合并后的) .arc 中的文件及其所在封包')
+    p_list.add_argument('-i', '--input', nargs='+', default=None, help='输入 .arc 文件路径，可指定多个 (按顺序合并，后面的优先)')
+    p_list.add_argument('-n', '--names', nargs='+', default=None, help='只列出指定的文件 (默认全部)')
 
     # Pack
     p_pack = subparsers.add_parser('pack', help='封包为 .arc 文件')
     p_pack.add_argument('-i', '--input', default=None, help='输入文件夹路径')
     p_pack.add_argument('-o', '--output', default=None, help='输出 .arc 文件路径')
     p_pack.add_argument('-enc', '--encrypt', action='store_true', help='同时加密 .ws2 文件')
+    p_pack.add_argument('-b', '--base', default=None, help='旧 .arc 文件路径，未改动的文件直接从中复制 (增量打包)')
 
     # Enc
     p_enc = subparsers.add_parser('enc', help='加密文件或文件夹')
@@ -258,12 +599,16 @@ if __name__ == "__main__":
     if args.command == 'unpack':
         final_input = get_arg(args.input, "输入 .arc 文件路径", "Rio1.arc")
         final_output = get_arg(args.output, "输出文件夹路径", "Rio1")
-        ArcManager.unpack(final_input, final_output, args.decrypt)
+        ArcManager.unpack(final_input, final_output, args.decrypt, args.names, args.jobs)
+
+    elif args.command == 'list':
+        final_input = get_arg(args.input, "输入 .arc 文件路径", "Rio1.arc")
+        ArcManager.list_files([final_input] if isinstance(final_input, str) else final_input, args.names)
 
     elif args.command == 'pack':
         final_input = get_arg(args.input, "输入文件夹路径", "Rio1_enc")
         final_output = get_arg(args.output, "输出 .arc 文件路径", "Rio1.chs")
-        ArcManager.pack(final_input, final_output, args.encrypt)
+        ArcManager.pack(final_input, final_output, args.encrypt, args.base)
 
     elif args.command == 'enc':
         final_input = get_arg(args.input, "输入路径", "Rio1_release")
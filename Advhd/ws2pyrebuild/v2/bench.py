@@ -0,0 +1,484 @@
+import os
+import io
+import time
+import argparse
+import textwrap
+import sys
+import json
+import shutil
+import subprocess
+import platform
+import tempfile
+import tracemalloc
+from datetime import datetime
+from ws2codec import *
+from WS2FILE import *
+from Lib import run_captured
+from gen_corpus import VARIANTS, generate_corpus
+from decompile import decompile_file
+from dump import dump_file
+from trans import trans_file, patch_file
+
+# suite 结果文件格式版本 (2: 按 variant 分别记录)
+RESULT_VERSION = 2
+
+# 旧实现 (逐字节 Python 循环)，仅作为基准对照
+
+def legacy_rotate_left_2(data: bytes) -> bytes:
+    res = bytearray(data)
+    for i in range(len(res)):
+        val = res[i]
+        res[i] = ((val << 2) & 0xFF) | (val >> 6)
+    return bytes(res)
+
+def legacy_rotate_right_2(data: bytes) -> bytes:
+    res = bytearray(data)
+    for i in range(len(res)):
+        val = res[i]
+        res[i] = ((val << 6) & 0xFF) | (val >> 2)
+    return bytes(res)
+
+def legacy_xor(data: bytes, enc: bytes) -> bytes:
+    data = bytearray(data)
+    for i in range(len(data)):
+        data[i] ^= enc[i % len(enc)]
+    return bytes(data)
+
+class LegacyWS2FileDumper(WS2FileDumper):
+    # 旧的逐字符遍历签名串的解码方式
+    def read_OP(self):
+        res = f"@{self.data.tell()}|"
+        op = self.data.readU8()
+        res += f"#{op:02X}|"
+        op = f"{op:02X}".lower()
+        if op not in self.oplist:
+            print(f"Unknown opcode {op} at {self.data.tell():08X}")
+            raise RuntimeError
+        else:
+            method_name = self.oplist[op]
+        i = 0
+        while i < len(method_name):
+            m = method_name[i]
+            i += 1
+            if m != "7" and m != "O":
+                method = self.methodsDict[m]
+                res += f"{m}::{method()}|"
+            elif m == "O":
+                length = self.read_O()
+                res += f"c::{length}|"
+                method_name = method_name[:i] + "wTcwct" * length + method_name[i:]
+            else:
+                m = method_name[i]
+                i += 1
+                method = self.methodsDict[m]
+                lists = self.read_7(method)
+                res += f"list::{len(lists)}|"
+                for content in lists:
+                    res += f"{m}::{content}|"
+        return res
+
+class LegacyWS2FileCompiler:
+    # 旧的解析方式: 保留全部原始行，每条指令一个 dict，每个参数一个 dict，值均为字符串
+    def __init__(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            self.lines = f.readlines()
+        self.commands = []
+        for line in self.lines:
+            line = line.strip()
+            if not line or line.startswith("//"):
+                continue
+            contents = line.split("|")
+            if len(contents) < 2 or not contents[0].startswith("@"):
+                continue
+            args = []
+            for c in contents[2:]:
+                if "::" in c:
+                    t, v = c.split("::", 1)
+                    args.append({"type": t, "value": v})
+            self.commands.append({"ori_offset": int(contents[0][1:]), "op": contents[1][1:], "args": args})
+
+def format_line(command):
+    # 旧结构 -> 反编译文本的一行
+    res = f"@{command['ori_offset']}|#{command['op']}|"
+    for arg in command["args"]:
+        res += f"{arg['type']}::{arg['value']}|"
+    return res
+
+def decompile_lines(dumper_class, data):
+    dumper = dumper_class(data)
+    lines = []
+    while not dumper.data.is_end():
+        lines.append(dumper.read_OP())
+    return lines
+
+def timeit(func, repeat=3):
+    # 取多次运行中的最短耗时
+    best = None
+    res = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        res = func()
+        cost = time.perf_counter() - start
+        if best is None or cost < best:
+            best = cost
+    return best, res
+
+def print_row(name, size, cost, base_cost=None):
+    mbps = size / cost / 1024 / 1024 if cost > 0 else float("inf")
+    line = f"  {name:<24} {cost * 1000:>10.2f} ms {mbps:>10.2f} MB/s"
+    if base_cost:
+        line += f"   x{base_cost / cost:.1f}"
+    print(line)
+
+def bench_codec(size_mb, repeat):
+    print(f"\n>> Benchmark: ws2 codec")
+    print(f"   数据大小: {size_mb} MB")
+
+    size = int(size_mb * 1024 * 1024)
+    data = os.urandom(size)
+    key = os.urandom(16)
+
+    cases = [
+        ("rotate_left_2", lambda: legacy_rotate_left_2(data), lambda: rotate_left_2(data)),
+        ("rotate_right_2", lambda: legacy_rotate_right_2(data), lambda: rotate_right_2(data)),
+        ("xor_repeat", lambda: legacy_xor(data, key), lambda: xor_repeat(data, key)),
+    ]
+    for name, legacy, new in cases:
+        legacy_cost, legacy_res = timeit(legacy, 1)
+        new_cost, new_res = timeit(new, repeat)
+        if legacy_res != new_res:
+            raise RuntimeError(f"{name} 结果与旧实现不一致")
+        print(f"[{name}]")
+        print_row("legacy", size, legacy_cost)
+        print_row("table/vectorized", size, new_cost, legacy_cost)
+
+    # 分块流式接口，验证与整块处理结果一致
+    out = io.BytesIO()
+    cost, _ = timeit(lambda: process_stream(io.BytesIO(data), out, 'xor', key, chunk_size=1000003), 1)
+    if out.getvalue() != xor_repeat(data, key):
+        raise RuntimeError("process_stream 分块结果与整块处理不一致")
+    print(f"[process_stream xor]")
+    print_row("chunked", size, cost)
+
+def load_ws2_files(path):
+    # path 可以是单个 .ws2 文件或文件夹 (需为已解密的 .ws2)
+    if os.path.isfile(path):
+        return [open_file_b(path)]
+    return [open_file_b(os.path.join(path, f)) for f in sorted(os.listdir(path)) if f.lower().endswith(".ws2")]
+
+def bench_decode(path, repeat):
+    print(f"\n>> Benchmark: ws2 decompile")
+    print(f"   输入: {path}")
+
+    datas = load_ws2_files(path)
+    if not datas:
+        print(f"[ERROR] 没有找到 .ws2 文件: {path}")
+        return
+    size = sum(len(data) for data in datas)
+    print(f"   文件数: {len(datas)}，总大小: {size / 1024 / 1024:.2f} MB")
+
+    legacy_cost, legacy_res = timeit(lambda: [decompile_lines(LegacyWS2FileDumper, data) for data in datas], repeat)
+    new_cost, new_res = timeit(lambda: [decompile_lines(WS2FileDumper, data) for data in datas], repeat)
+    if legacy_res != new_res:
+        raise RuntimeError("反编译结果与旧实现不一致")
+    print(f"[decompile]")
+    print_row("legacy signature walk", size, legacy_cost)
+    print_row("decode plans", size, new_cost, legacy_cost)
+
+def measure_memory(func):
+    # 返回 (耗时, 解析结果保留的内存, 峰值内存)
+    tracemalloc.start()
+    start = time.perf_counter()
+    res = func()
+    cost = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del res
+    return cost, current, peak
+
+def bench_memory(path, scale):
+    print(f"\n>> Benchmark: parsed command memory")
+    print(f"   输入: {path}")
+
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    # scale > 1 时把脚本重复多次，模拟超大的剧本文件
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix=".txt", delete=False) as f:
+        for _ in range(scale):
+            f.write(text)
+        temp_path = f.name
+
+    try:
+        size = os.path.getsize(temp_path)
+        print(f"   文本大小: {size / 1024 / 1024:.2f} MB (x{scale})")
+        cases = [
+            ("legacy dict", lambda: LegacyWS2FileCompiler(temp_path)),
+            ("WS2Command", lambda: WS2FileCompiler(temp_path, "utf-16-le")),
+        ]
+        print(f"  {'':<24} {'time':>13} {'retained':>13} {'peak':>13}")
+        for name, func in cases:
+            cost, current, peak = measure_memory(func)
+            print(f"  {name:<24} {cost * 1000:>10.2f} ms {current / 1024 / 1024:>10.2f} MB {peak / 1024 / 1024:>10.2f} MB")
+
+        legacy = LegacyWS2FileCompiler(temp_path)
+        new = WS2FileCompiler(temp_path, "utf-16-le")
+        if [format_line(c) for c in legacy.commands] != [format_command(c) for c in new.commands]:
+            raise RuntimeError("解析结果与旧实现不一致")
+    finally:
+        os.remove(temp_path)
+
+def time_stage(files, func):
+    # 依次对每个文件执行 func，返回 (总耗时, 结果列表)，工具自身的输出不显示
+    results = []
+    start = time.perf_counter()
+    for file in files:
+        res, _, _ = run_captured(func, file)
+        results.append(res)
+    return time.perf_counter() - start, results
+
+def suite_v2(work, files):
+    # v2 (UTF-16LE) 工具的各阶段耗时，往返结果必须一致
+    dec_path = os.path.join(work, "dec")
+    txt_path = os.path.join(work, "txt")
+    json_path = os.path.join(work, "json")
+    rel_path = os.path.join(work, "rel")
+    patch_path = os.path.join(work, "patch")
+    for path in (txt_path, json_path, rel_path, patch_path):
+        os.makedirs(path, exist_ok=True)
+    txts = [file + ".txt" for file in files]
+    originals = {file: open_file_b(os.path.join(dec_path, file)) for file in files}
+    stages = {}
+
+    # .ws2 -> .txt
+    cost, errors = time_stage(files, lambda file: decompile_file(dec_path, txt_path, file))
+    if any(errors):
+        raise RuntimeError(f"反编译失败: {[e for e in errors if e]}")
+    stages["decompile"] = cost
+
+    # .txt -> WS2Command
+    cost, compilers = time_stage(txts, lambda file: WS2FileCompiler(os.path.join(txt_path, file), "utf-16-le"))
+    stages["parse"] = cost
+
+    # WS2Command -> .ws2，必须与原文件逐字节一致
+    cost, outputs = time_stage(compilers, lambda compiler: compiler.compile_bytes())
+    for file, data in zip(files, outputs):
+        if data != originals[file]:
+            raise RuntimeError(f"{file} 反编译后重新编译的结果与原文件不一致")
+    stages["compile"] = cost
+
+    # .txt -> .json
+    cost, _ = time_stage(txts, lambda file: dump_file(txt_path, json_path, file, False))
+    stages["dump"] = cost
+
+    # .txt + .json -> .ws2 (文本模式) 与 .ws2 + .json -> .ws2 (补丁模式)，两者结果必须一致
+    cost, _ = time_stage(txts, lambda file: trans_file(txt_path, json_path, rel_path, {}, file, False))
+    stages["reinject"] = cost
+    cost, _ = time_stage(files, lambda file: patch_file(dec_path, json_path, patch_path, {}, file))
+    stages["patch"] = cost
+    for file in files:
+        if open_file_b(os.path.join(rel_path, file)) != open_file_b(os.path.join(patch_path, file)):
+            raise RuntimeError(f"{file} 文本模式与补丁模式的回填结果不一致")
+    return stages
+
+def suite_v1(work):
+    # v1 (CP932) 的工具与 v2 模块同名，在子进程中计时 (见 bench_v1.py)
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_v1.py")
+    res = subprocess.run([sys.executable, script, work], capture_output=True, text=True, encoding="utf-8")
+    if res.returncode != 0:
+        raise RuntimeError(f"v1 测试失败: {res.stderr.strip()}")
+    return json.loads(res.stdout)
+
+def bench_suite(count, size_kb, seed, output, baseline, keep, variant="v2"):
+    variants = list(VARIANTS) if variant == "both" else [variant]
+    print(f"\n>> Benchmark: round-trip suite")
+    print(f"   语料: {count} x {size_kb} KB (seed {seed}, {', '.join(variants)})")
+
+    base_variants = {}
+    if baseline:
+        base = open_json(baseline)
+        # 版本 1 的结果只有 v2
+        base_variants = base.get("variants", {"v2": {"stages": base.get("stages", {})}})
+        print(f"   对比: {baseline}")
+
+    results = {}
+    for name in variants:
+        work = os.path.join(keep, name) if keep else tempfile.mkdtemp(prefix="ws2bench_")
+        dec_path = os.path.join(work, "dec")
+        try:
+            start = time.perf_counter()
+            files = generate_corpus(dec_path, count, size_kb * 1024, seed, name)
+            print(f"\n   [{name}] 生成耗时: {(time.perf_counter() - start) * 1000:.2f} ms")
+            size = sum(os.path.getsize(os.path.join(dec_path, file)) for file in files)
+
+            costs = suite_v1(work) if name == "v1" else suite_v2(work, files)
+            stages = {stage: {"seconds": cost, "mb_per_s": size / cost / 1024 / 1024 if cost > 0 else None}
+                      for stage, cost in costs.items()}
+            print(f"   [{name}] 总大小: {size / 1024 / 1024:.2f} MB，往返校验通过")
+
+            base_stages = base_variants.get(name, {}).get("stages", {})
+            for stage, res in stages.items():
+                line = f"  {stage:<24} {res['seconds'] * 1000:>10.2f} ms {res['mb_per_s']:>10.2f} MB/s"
+                if stage in base_stages:
+                    line += f"   x{base_stages[stage]['seconds'] / res['seconds']:.2f}"
+                print(line)
+
+            results[name] = {
+                "corpus": {"count": count, "size_kb": size_kb, "seed": seed, "bytes": size, "encoding": VARIANTS[name][0]},
+                "stages": stages,
+            }
+        finally:
+            if not keep:
+                shutil.rmtree(work, ignore_errors=True)
+
+    if output:
+        save_json(output, {
+            "version": RESULT_VERSION,
+            "time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "variants": results,
+        })
+        print(f"   结果已保存: {output}")
+
+def bench_profile(path, output, top):
+    # 逐条指令统计整个语料: 各 opcode 的次数/字节数/解码耗时，以及各文件的吞吐量
+    print(f"\n>> Benchmark: opcode profile")
+    print(f"   输入: {path}")
+
+    if os.path.isfile(path):
+        names = [path]
+    else:
+        names = [os.path.join(path, f) for f in sorted(os.listdir(path)) if f.lower().endswith(".ws2")]
+    if not names:
+        print(f"[ERROR] 没有找到 .ws2 文件: {path}")
+        return
+
+    oplist, _ = load_plans()
+    signatures = {int(op, 16): signature for op, signature in oplist.items()}
+    totals = {}
+    files = {}
+    for name in names:
+        data = open_file_b(name)
+        profiler = WS2FileProfiler(data)
+        error = None
+        start = time.perf_counter()
+        try:
+            # 未知 opcode 等错误时保留已统计的部分，记录出错位置 (oplist.json 与新版本不符时定位用)
+            for _ in profiler.iter_ops():
+                pass
+        except Exception as e:
+            error = f"{type(e).__name__}{f': {e}' if str(e) else ''} at {profiler.data.pos:08X}"
+        cost = time.perf_counter() - start
+        for op, (count, size, ns) in profiler.stats.items():
+            total = totals.setdefault(op, [0, 0, 0])
+            total[0] += count
+            total[1] += size
+            total[2] += ns
+        files[os.path.basename(name)] = {
+            "bytes": len(data),
+            "ops": sum(stat[0] for stat in profiler.stats.values()),
+            "seconds": cost,
+            "mb_per_s": len(data) / cost / 1024 / 1024 if cost > 0 else 0,
+            "error": error,
+        }
+
+    size = sum(res["bytes"] for res in files.values())
+    total_ns = sum(stat[2] for stat in totals.values()) or 1
+    ops = {}
+    for op, (count, op_size, ns) in sorted(totals.items(), key=lambda item: item[1][2], reverse=True):
+        ops[f"{op:02X}"] = {
+            "signature": signatures.get(op, ""),
+            "count": count,
+            "bytes": op_size,
+            "ns": ns,
+            "ns_per_op": ns / count,
+            "time_share": ns / total_ns,
+        }
+
+    print(f"   文件数: {len(files)}，总大小: {size / 1024 / 1024:.2f} MB，指令数: {sum(op['count'] for op in ops.values())}")
+    print(f"  {'op':<4} {'count':>9} {'bytes':>11} {'ms':>9} {'ns/op':>8} {'time':>7}  signature")
+    for key, res in list(ops.items())[:top]:
+        print(f"  {key:<4} {res['count']:>9} {res['bytes']:>11} {res['ns'] / 1e6:>9.2f} {res['ns_per_op']:>8.0f} {res['time_share'] * 100:>6.1f}%  {res['signature']}")
+    if len(ops) > top:
+        print(f"  ... 其余 {len(ops) - top} 种指令见 JSON 结果")
+
+    print(f"[files]")
+    for file, res in sorted(files.items(), key=lambda item: item[1]["mb_per_s"]):
+        line = f"  {file:<24} {res['seconds'] * 1000:>10.2f} ms {res['mb_per_s']:>10.2f} MB/s {res['ops']:>9} ops"
+        if res["error"]:
+            line += f"   [ERROR] {res['error']}"
+        print(line)
+
+    if output:
+        save_json(output, {
+            "version": RESULT_VERSION,
+            "time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "input": path,
+            "bytes": size,
+            "ops": ops,
+            "files": files,
+        })
+        print(f"   结果已保存: {output}")
+
+if __name__ == "__main__":
+    desc_text = textwrap.dedent("""\
+    ================================================
+    AdvHD WS2 Tools Benchmark
+    usage: python bench.py <command> [options]
+    """)
+
+    parser = argparse.ArgumentParser(
+        description=desc_text,
+        formatter_class=argparse.RawTextHelpFormatter,
+        usage=argparse.SUPPRESS
+    )
+
+    subparsers = parser.add_subparsers(dest='command', title="Available Commands", metavar="")
+
+    # Codec
+    p_codec = subparsers.add_parser('codec', help='加密/解密/异或 吞吐量对比')
+    p_codec.add_argument('-s', '--size', type=float, default=8, help='测试数据大小 (MB)')
+    p_codec.add_argument('-r', '--repeat', type=int, default=3, help='重复次数')
+
+    # Decode
+    p_decode = subparsers.add_parser('decode', help='反编译吞吐量对比 (旧签名遍历 vs 预编译解码计划)')
+    p_decode.add_argument('-i', '--input', required=True, help='已解密的 .ws2 文件或文件夹路径')
+    p_decode.add_argument('-r', '--repeat', type=int, default=3, help='重复次数')
+
+    # Memory
+    p_memory = subparsers.add_parser('memory', help='反编译文本解析后的内存占用对比 (旧 dict 结构 vs WS2Command)')
+    p_memory.add_argument('-i', '--input', required=True, help='反编译得到的 .txt 文件路径')
+    p_memory.add_argument('-s', '--scale', type=int, default=1, help='将脚本重复 N 次以模拟大文件')
+
+    # Suite
+    p_suite = subparsers.add_parser('suite', help='随机语料上的 反编译/解析/编译/dump/回填 往返测试与计时')
+    p_suite.add_argument('-n', '--count', type=int, default=10, help='生成的文件数')
+    p_suite.add_argument('-s', '--size', type=int, default=256, help='每个文件的大小 KB')
+    p_suite.add_argument('--seed', type=int, default=0, help='随机种子')
+    p_suite.add_argument('-o', '--output', default=None, help='结果 JSON 输出路径')
+    p_suite.add_argument('-b', '--baseline', default=None, help='作为对比基准的旧结果 JSON')
+    p_suite.add_argument('-k', '--keep', default=None, help='保留语料与中间结果的文件夹 (默认使用临时文件夹并在结束后删除)')
+    p_suite.add_argument('--variant', choices=list(VARIANTS) + ['both'], default='both', help='v1: CP932 语料与 v1 工具 / v2: UTF-16LE 语料与 v2 工具 / both: 两者 (默认 both)')
+
+    # Profile
+    p_profile = subparsers.add_parser('profile', help='按 opcode 统计次数/字节数/解码耗时，以及各文件吞吐量')
+    p_profile.add_argument('-i', '--input', required=True, help='已解密的 .ws2 文件或文件夹路径')
+    p_profile.add_argument('-o', '--output', default=None, help='结果 JSON 输出路径')
+    p_profile.add_argument('-t', '--top', type=int, default=30, help='表格显示的指令数 (按耗时排序，默认 30)')
+
+    args = parser.parse_args()
+
+    if args.command == 'codec':
+        bench_codec(args.size, args.repeat)
+    elif args.command == 'decode':
+        bench_decode(args.input, args.repeat)
+    elif args.command == 'memory':
+        bench_memory(args.input, args.scale)
+    elif args.command == 'suite':
+        bench_suite(args.count, args.size, args.seed, args.output, args.baseline, args.keep, args.variant)
+    elif args.command == 'profile':
+        bench_profile(args.input, args.output, args.top)
+    else:
+        parser.print_help()
@@ -0,0 +1,75 @@
+import os
+import io
+import sys
+import time
+import json
+import contextlib
+
+# bench.py suite --variant v1 的子进程: 用 v1 的工具对 CP932 语料计时，结果以 JSON 输出到 stdout
+# v1 与 v2 的模块同名 (Lib / WS2FILE / dump / trans)，不能在同一进程中导入，因此单独运行
+# usage: python bench_v1.py WORK_DIR (WORK_DIR/dec 中为 gen_corpus.py --variant v1 生成的 .ws2)
+
+V1_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "v1")
+
+def time_stage(func):
+    # 执行 func 并返回耗时，v1 工具自身的输出不显示
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()
+    return time.perf_counter() - start
+
+def run_suite(work):
+    # v1 的 WS2FileDumper 按当前目录读取 oplist.json
+    os.chdir(V1_PATH)
+    sys.path.insert(0, V1_PATH)
+    from Lib import open_file_b
+    from WS2FILE import WS2FileDumper, WS2FileCompiler
+    from dump import batch_dump
+    from trans import batch_trans
+
+    dec_path = os.path.join(work, "dec")
+    txt_path = os.path.join(work, "txt")
+    json_path = os.path.join(work, "json")
+    rel_path = os.path.join(work, "rel")
+    cmp_path = os.path.join(work, "cmp")
+    for path in (txt_path, json_path, rel_path, cmp_path):
+        os.makedirs(path, exist_ok=True)
+    files = sorted(file for file in os.listdir(dec_path) if file.endswith(".ws2"))
+    originals = {file: open_file_b(os.path.join(dec_path, file)) for file in files}
+    stages = {}
+
+    # .ws2 -> .txt
+    def decompile():
+        for file in files:
+            WS2FileDumper(originals[file]).dump(os.path.join(txt_path, file + ".txt"))
+    stages["decompile"] = time_stage(decompile)
+
+    # .txt -> 指令
+    compilers = []
+    def parse():
+        for file in files:
+            compilers.append(WS2FileCompiler(os.path.join(txt_path, file + ".txt"), "932"))
+    stages["parse"] = time_stage(parse)
+
+    # 指令 -> .ws2，必须与原文件逐字节一致
+    def build():
+        for file, compiler in zip(files, compilers):
+            compiler.preCompile()
+            compiler.compile(os.path.join(cmp_path, file))
+    stages["compile"] = time_stage(build)
+    for file in files:
+        if open_file_b(os.path.join(cmp_path, file)) != originals[file]:
+            raise RuntimeError(f"{file} 反编译后重新编译的结果与原文件不一致")
+
+    # dump / trans 会在当前目录写出 namedict.json 与 warning_report.txt，切换到工作目录
+    os.chdir(work)
+    stages["dump"] = time_stage(lambda: batch_dump(txt_path, json_path))
+    stages["reinject"] = time_stage(lambda: batch_trans(txt_path, json_path, rel_path, os.path.join(work, "namedict_trans.json")))
+    return stages
+
+if __name__ == "__main__":
+    try:
+        print(json.dumps(run_suite(os.path.abspath(sys.argv[1]))))
+    except Exception as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        sys.exit(1)
@@ -5,6 +5,7 @@ import textwrap
 import sys
 import re
 from datetime import datetime
+from Lib import hash_file, map_jobs, open_json, save_json
 
 # 异常字符集
 # 半角: < > / \ { } [ ] | * ^ % $ # @ `:
@@ -14,30 +15,46 @@ ABNORMAL_CHARS = r'[<>/\\{}[\]|*^%$#@`:＜＞／＼｛｝［］｜＊＾％＄
 # 非法控制字符 (排除 \n 和 \r)
 ILLEGAL_CONTROL_CHARS = r'[\x00-\x09\x0b-\x1f]'
 
+# 三项检测合并为一次扫描:
+# ctrl: 非法控制字符；abn: 异常字符；esc: abn 为反斜杠且后接 uXXXX 时为 Unicode 转义残留 (反斜杠本身仍算异常字符)
+CHECK_PATTERN = re.compile(
+    rf'(?P<ctrl>{ILLEGAL_CONTROL_CHARS})|(?P<abn>{ABNORMAL_CHARS})(?:(?<=\\)(?=(?P<esc>u[0-9a-fA-F]{{4}})))?'
+)
+
+# 增量检测缓存，放在输入文件夹的子目录中 (不会被当作待检测的 .json)
+# 检测规则或报告格式变化时需要修改版本号
+CACHE_DIR = "__checkcache__"
+CACHE_VERSION = 2
+
 def check_content(text, filename, index, field, logs):
 
     if not text:
         return
 
+    # 一次扫描得到 [(ctrl, abn, esc), ...]，绝大多数文本没有匹配，直接返回
+    found = CHECK_PATTERN.findall(text)
+    if not found:
+        return
+
+    bad_chars = dict.fromkeys(abn for _, abn, _ in found if abn)
+    ctrl_chars = [ctrl for ctrl, _, _ in found if ctrl]
+    unicode_residue = ["\\" + esc for _, _, esc in found if esc]
+
     errors = []
 
     # 检测非法标点/特殊符号
-    bad_chars = set(re.findall(ABNORMAL_CHARS, text))
     if bad_chars:
         errors.append(f"[非正常标点]: {', '.join(bad_chars)}")
 
     # 检测非法控制字符
-    ctrl_chars = re.findall(ILLEGAL_CONTROL_CHARS, text)
     if ctrl_chars:
         # 将控制字符转换为 \xHH 格式显示
         ctrl_display = [f"\\x{ord(c):02x}" for c in ctrl_chars]
         errors.append(f"[非法控制符]: {', '.join(ctrl_display)}")
 
     # 检测 Unicode 转义残留
-    if "\\u" in text:
-        unicode_residue = re.findall(r'\\u[0-9a-fA-F]{4}', text)
-        if unicode_residue:
-             errors.append(f"[转义符残留]: {', '.join(unicode_residue)}")
+    if unicode_residue:
+        errors.append(f"[转义符残留]: {', '.join(unicode_residue)}")
 
     # 生成格式化的日志块
     if errors:
@@ -49,7 +66,58 @@ def check_content(text, filename, index, field, logs):
         )
         logs.append(log_block)
 
-def batch_check(input_path, output_file):
+def check_file(input_path, filename):
+    # 检测单个文件，返回 (是否计入扫描数, 日志列表)，供父进程汇总
+    logs = []
+    file_path = os.path.join(input_path, filename)
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        if not isinstance(data, list):
+            print(f"[SKIP] {filename} 格式不是列表")
+            return False, logs
+
+        for index, item in enumerate(data):
+            if "name" in item:
+                check_content(item["name"], filename, index, "Name", logs)
+            if "message" in item:
+                check_content(item["message"], filename, index, "Msg ", logs)
+        return True, logs
+
+    except json.JSONDecodeError:
+        print(f"[ERROR] 无法解析 JSON: {filename}")
+    except Exception as e:
+        print(f"[ERROR] 处理文件 {filename} 时发生异常: {e}")
+    return False, logs
+
+def load_check_cache(cache_path):
+    try:
+        cache = open_json(cache_path)
+        if cache.get("version") == CACHE_VERSION:
+            return cache["files"]
+    except Exception:
+        pass
+    return {}
+
+def save_check_cache(cache_path, files):
+    # 缓存写入失败 (如只读目录) 不影响检测结果
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        save_json(cache_path, {"version": CACHE_VERSION, "files": files})
+    except OSError:
+        pass
+
+def get_file_key(file_path, record):
+    # mtime 与大小一致时沿用记录中的哈希，否则重新计算内容哈希
+    stat = os.stat(file_path)
+    if record and record["mtime_ns"] == stat.st_mtime_ns and record["size"] == stat.st_size:
+        digest = record["digest"]
+    else:
+        digest = hash_file(file_path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "digest": digest}
+
+def batch_check(input_path, output_file, use_cache=True, jobs=1):
     print(f"\n>> Command: JSON 内容检测")
     print(f"   输入: {input_path}")
     print(f"   输出: {output_file}")
@@ -65,29 +133,44 @@ def batch_check(input_path, output_file):
     files = [f for f in os.listdir(input_path) if f.endswith(".json")]
     
     print("正在扫描...")
-    
+
+    # 增量模式: 内容哈希与上次一致的文件直接使用缓存的结果
+    cache_path = os.path.join(input_path, CACHE_DIR, "check.cache")
+    records = load_check_cache(cache_path) if use_cache else {}
+    new_records = {}
+    results = {}
+    todo = []
     for filename in files:
-        file_path = os.path.join(input_path, filename)
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            if not isinstance(data, list):
-                print(f"[SKIP] {filename} 格式不是列表")
-                continue
+        record = records.get(filename)
+        key = get_file_key(os.path.join(input_path, filename), record)
+        if record and record["digest"] == key["digest"]:
+            results[filename] = (record["counted"], record["logs"])
+            new_records[filename] = dict(record, **key)
+        else:
+            todo.append(filename)
+            new_records[filename] = key
 
+    if use_cache:
+        print(f"  -> 跳过 {len(files) - len(todo)} 个未改动的文件，检测 {len(todo)} 个文件")
+
+    tasks = [(input_path, filename) for filename in todo]
+    for filename, (counted, logs) in zip(todo, map_jobs(check_file, tasks, jobs)):
+        results[filename] = (counted, logs)
+        if counted:
+            new_records[filename].update({"counted": counted, "logs": logs})
+        else:
+            # 读取失败的文件不缓存，每次都重新检测并报错，直到修复
+            del new_records[filename]
+
+    # 按文件顺序汇总，与串行检测的报告一致
+    for filename in files:
+        counted, logs = results[filename]
+        if counted:
             file_count += 1
-            
-            for index, item in enumerate(data):
-                if "name" in item:
-                    check_content(item["name"], filename, index, "Name", all_logs)
-                if "message" in item:
-                    check_content(item["message"], filename, index, "Msg ", all_logs)
+        all_logs.extend(logs)
 
-        except json.JSONDecodeError:
-            print(f"[ERROR] 无法解析 JSON: {filename}")
-        except Exception as e:
-            print(f"[ERROR] 处理文件 {filename} 时发生异常: {e}")
+    if use_cache:
+        save_check_cache(cache_path, new_records)
 
     issue_count = len(all_logs)
 
@@ -140,6 +223,8 @@ if __name__ == "__main__":
 
     parser.add_argument("-i", "--input", default=None, help="待检测的 JSON 文件夹路径")
     parser.add_argument("-o", "--output", default=None, help="检测报告输出路径")
+    parser.add_argument("--no-cache", action="store_true", help="不使用增量检测缓存 (__checkcache__)，全部重新检测")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="并行进程数 (默认 1)")
     
     args = parser.parse_args()
 
@@ -152,7 +237,7 @@ if __name__ == "__main__":
     final_input = get_arg(args.input, "请输入 JSON 文件夹路径", default_input_path)
     final_output = get_arg(args.output, "请输入报告输出文件名", "check.txt")
 
-    batch_check(final_input, final_output)
+    batch_check(final_input, final_output, not args.no_cache, args.jobs)
 
     if len(sys.argv) == 1:
         input("\n按回车键退出...")
\ No newline at end of file
@@ -1,10 +1,101 @@
 from WS2FILE import *
+from dump import DUMP_OPS, dump_commands, write_warning_report
 import os
 import argparse
 import textwrap
 import sys
 
-def batch_decompile(scr_path, out_path):
+def decompile_file(scr_path, out_path, file):
+    # 反编译单个文件，返回错误信息 (成功时为 None)
+    try:
+        with open(os.path.join(scr_path, file), "rb") as f:
+            data = f.read()
+        dumper = WS2FileDumper(data)
+        output_file = os.path.join(out_path, file + ".txt")
+        dumper.dump(output_file)
+        return None
+    except Exception as e:
+        return str(e)
+
+# 仅文本模式的偏移表格式版本
+OFFSET_MAP_VERSION = 1
+
+def get_offset_map_path(out_path):
+    # 偏移表放在输出文件夹旁边，避免被当作译文 .json
+    return os.path.normpath(out_path) + ".offsets.json"
+
+def extract_text_file(scr_path, out_path, file):
+    # 仅文本模式: 只解码人名/对话/选项指令 (其余指令只按解码计划跳过)，直接输出 dump 的 .json
+    # 返回 (错误信息, 字数, 人名表, 警告列表, 偏移表)，偏移表为 [[ori_offset, choice, 起始位置, 结束位置], ...]
+    try:
+        data = open_file_b(os.path.join(scr_path, file))
+        commands = {}
+        spans = {}
+        for record, record_spans in WS2FileDumper(data).iter_spans(DUMP_OPS):
+            commands[record.offset] = op_to_command(record)
+            spans[record.offset] = record_spans
+
+        # 与 decompile.py + dump.py 的命名保持一致，trans.py 可以直接使用
+        name = file + ".txt"
+        warning_logs = []
+        out = dump_commands(name, commands.values(), warning_logs, scr_path)
+        out.save_json(os.path.join(out_path, name + ".json"))
+
+        # 每条译文对应的字符串在 .ws2 中的位置 (Op14 为 itTc 中的 T，Op0F 为第 choice 个 T)
+        offsets = []
+        for entry in out.outlist:
+            offset = entry["ori_offset"]
+            command = commands[offset]
+            choice = entry.get("choice", 0)
+            if command.op == 0x14:
+                index = 2
+            else:
+                index = [i for i, code in enumerate(command.types) if code == TYPE_T][choice]
+            start, end = spans[offset][index]
+            offsets.append([offset, choice, start, end])
+        return None, out.textcount, out.get_names(), warning_logs, offsets
+    except Exception as e:
+        return str(e), 0, {}, [], []
+
+def batch_extract_text(scr_path, out_path, jobs=1):
+    print(f"\n>> Command: .ws2 仅文本提取")
+    print(f"   输入: {scr_path}")
+    print(f"   输出: {out_path}")
+
+    if not os.path.exists(scr_path):
+        print(f"[ERROR] 输入文件夹不存在: {scr_path}")
+        return
+
+    os.makedirs(out_path, exist_ok=True)
+    files = [file for file in os.listdir(scr_path) if file.lower().endswith(".ws2")]
+    info = StatusInfo()
+    warning_logs = []
+    offset_map = {}
+    count = 0
+
+    tasks = [(scr_path, out_path, file) for file in files]
+    for file, (error, textcount, names, logs, offsets) in zip(files, map_jobs(extract_text_file, tasks, jobs)):
+        if error is None:
+            count += 1
+            info.update_counts(textcount, names)
+            warning_logs.extend(logs)
+            offset_map[file] = offsets
+        else:
+            print(f"  [ERROR] 处理 {file} 失败: {error}")
+
+    # 偏移表条目很多，紧凑输出
+    offset_map_path = get_offset_map_path(out_path)
+    with open(offset_map_path, "w", encoding="utf-8") as f:
+        json.dump({"version": OFFSET_MAP_VERSION, "encoding": "utf-16-le", "files": offset_map}, f, separators=(",", ":"))
+
+    info.output(1)
+
+    write_warning_report(warning_logs, scr_path)
+
+    print(f"   偏移表: {offset_map_path}")
+    print(f"\n所有任务完成，共处理 {count} 个文件。")
+
+def batch_decompile(scr_path, out_path, jobs=1):
     print(f"\n>> Command: .ws2 反编译")
     print(f"   输入: {scr_path}")
     print(f"   输出: {out_path}")
@@ -14,25 +105,17 @@ def batch_decompile(scr_path, out_path):
         return
 
     os.makedirs(out_path, exist_ok=True)
-    files = os.listdir(scr_path)
+    files = [file for file in os.listdir(scr_path) if file.lower().endswith(".ws2")]
     count = 0
 
-    for file in files:
-        if not file.lower().endswith(".ws2"):
-            continue
+    tasks = [(scr_path, out_path, file) for file in files]
+    for file, error in zip(files, map_jobs(decompile_file, tasks, jobs)):
         #print(f"Processing {file}...") 
-        try:
-            with open(os.path.join(scr_path, file), "rb") as f:
-                data = f.read()
-            dumper = WS2FileDumper(data)
-            output_file = os.path.join(out_path, file + ".txt")
-            dumper.dump(output_file)
-            
+        if error is None:
             count += 1
             print(f"  -> 已处理: {file}")
-            
-        except Exception as e:
-            print(f"  [ERROR] 处理 {file} 失败: {e}")
+        else:
+            print(f"  [ERROR] 处理 {file} 失败: {error}")
 
     print(f"\n所有任务完成，共处理 {count} 个文件。")
 
@@ -49,7 +132,7 @@ if __name__ == "__main__":
     desc_text = textwrap.dedent("""\
     ================================================
     AdvHD WS2 Decompiler Tool
-    usage: python decompile.py [-i INPUT] [-o OUTPUT]
+    usage: python decompile.py [-i INPUT] [-o OUTPUT] [--text-only]
     """)
 
     parser = argparse.ArgumentParser(
@@ -60,6 +143,8 @@ if __name__ == "__main__":
 
     parser.add_argument("-i", "--input", default=None, help="已解密的 .ws2 文件输入路径")
     parser.add_argument("-o", "--output", default=None, help="输出路径")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="并行进程数 (默认 1)")
+    parser.add_argument("--text-only", action="store_true", help="仅文本模式: 不输出反编译文本，直接输出 dump 的 .json 与偏移表 (<输出>.offsets.json)")
     
     args = parser.parse_args()
 
@@ -67,9 +152,12 @@ if __name__ == "__main__":
         print(desc_text)
 
     final_input = get_arg(args.input, "请输入已解密的 .ws2 文件夹路径", "Rio1_dec")
-    final_output = get_arg(args.output, "请输入输出路径", "Rio1_dec_dump")
-
-    batch_decompile(final_input, final_output)
+    if args.text_only:
+        final_output = get_arg(args.output, "请输入 .json 输出路径", "Rio1_dec_dump_json")
+        batch_extract_text(final_input, final_output, args.jobs)
+    else:
+        final_output = get_arg(args.output, "请输入输出路径", "Rio1_dec_dump")
+        batch_decompile(final_input, final_output, args.jobs)
 
     if len(sys.argv) == 1:
         input("\n按回车键退出...")
\ No newline at end of file
@@ -1,5 +1,7 @@
 from Lib import *
 from WS2FILE import *
+from tm import TranslationMemory
+from shard import open_shard_writer, report_shards
 import os
 import argparse
 import re
@@ -7,88 +9,81 @@ import sys
 import textwrap
 from datetime import datetime
 
-def batch_dump(oriPath, outPath):
-    os.makedirs(outPath, exist_ok=True)
-    info = StatusInfo()
-    warning_logs = []
-
-    def check_text(text, context_type, file_name, offset_val):
-        # 将文本转为 JSON 转义格式，查看是否有 \uXXXX，若有则说明存在特殊的符号未处理，需要注意
-        json_str = json.dumps(text, ensure_ascii=False)
-        if "\\u" in json_str:
-            bad_chars = re.findall(r'\\u[0-9a-fA-F]{4}', json_str)
-            log_entry = (
-                f"文件: {file_name}\n"
-                f"位置: @{offset_val} (请在{oriPath}中搜索 @{offset_val} 定位)\n"
-                f"类型: {context_type}\n"
-                f"包含特殊字符: {', '.join(set(bad_chars))}\n"
-                f"原文内容: {text}\n"
-                f"{'-'*30}"
-            )
-            warning_logs.append(log_entry)
-
-    print(f"开始处理... 输入: {oriPath} -> 输出: {outPath}")
-
-    for file in os.listdir(oriPath):
-        if not file.endswith(".txt"):
-            continue
+# dump_commands 用到的指令: 人名 (15) / 对话 (14) / 选项 (0F)
+DUMP_OPS = frozenset({0x15, 0x14, 0x0F})
+
+def check_text(text, context_type, file_name, offset_val, warning_logs, oriPath):
+    # 将文本转为 JSON 转义格式，查看是否有 \uXXXX，若有则说明存在特殊的符号未处理，需要注意
+    json_str = json.dumps(text, ensure_ascii=False)
+    if "\\u" in json_str:
+        bad_chars = re.findall(r'\\u[0-9a-fA-F]{4}', json_str)
+        log_entry = (
+            f"文件: {file_name}\n"
+            f"位置: @{offset_val} (请在{oriPath}中搜索 @{offset_val} 定位)\n"
+            f"类型: {context_type}\n"
+            f"包含特殊字符: {', '.join(set(bad_chars))}\n"
+            f"原文内容: {text}\n"
+            f"{'-'*30}"
+        )
+        warning_logs.append(log_entry)
+
+def dump_commands(file, contents, warning_logs, oriPath):
+    # 从指令列表中提取人名/对话/选项，返回 OriJsonOutput
+    out = OriJsonOutput()
+    
+    for c in contents:
+        op = c.op
+        offset = c.ori_offset # 获取偏移量
+
+        # 提取人名
+        if op == 0x15:
+            name = c.values[0]
+            if name != "" and not name.startswith("%LC"):
+                msg_str = f"文件: {file} | 位置: @{offset} | 警告: 人名格式异常 -> {name}\n{'-'*30}"
+                warning_logs.append(msg_str)
+                print(f"Warning: {name} is not a valid name, skipping.")
+            
+            name = name.replace("%LC", "")
+            out.add_name(name)
+            
+        # 提取普通对话 (Opcode 14)
+        elif op == 0x14:
+            # 这里的 values[2] 对应 Opcode 定义 "itTc" 中的 T (文本)
+            if len(c.values) > 2:
+                msg = c.values[2]
+
+                check_text(msg, "普通对话 (Op14)", file, offset, warning_logs, oriPath)
+
+                # 保留换行符(不保留的话请去除，Advhd支持自动换行)
+                # msg = msg.replace("\\n", "") 
+
+                if "name" in out.dic and out.dic["name"] == "":
+                    del out.dic["name"]
+                out.add_text(msg)
+                # 去除末尾的控制符 %K %P
+                out.dic["message"] = re.sub(r"[%KP]*$", "", out.dic["message"])
+                # 记录原文位置，trans.py 按偏移量回填
+                out.dic["ori_offset"] = offset
+                out.append_dict()
+
+        # 提取选项 (Opcode 0F)
+        elif op == 0x0F:
+            choice = 0
+            for code, msg in zip(c.types, c.values):
+                # 只提取类型为 T 的内容
+                if code == TYPE_T:
+                    check_text(msg, "选项 (Op0F)", file, offset, warning_logs, oriPath)
 
-        #print(f"Processing {file}...")
-        out = OriJsonOutput()
-        
-        compiler = WS2FileCompiler(os.path.join(oriPath, file), "utf-8")
-        contents = compiler.commands
-        
-        for c in contents:
-            op = c["op"]
-            offset = c.get("ori_offset", "Unknown") # 获取偏移量
-
-            # 提取人名
-            if op == "15":
-                name = c["args"][0]["value"]
-                if name != "" and not name.startswith("%LC"):
-                    msg_str = f"文件: {file} | 位置: @{offset} | 警告: 人名格式异常 -> {name}\n{'-'*30}"
-                    warning_logs.append(msg_str)
-                    print(f"Warning: {name} is not a valid name, skipping.")
-                
-                name = name.replace("%LC", "")
-                out.add_name(name)
-                
-            # 提取普通对话 (Opcode 14)
-            elif op == "14":
-                # 这里的 args[2] 对应 Opcode 定义 "itTc" 中的 T (文本)
-                if len(c["args"]) > 2:
-                    msg = c["args"][2]["value"]
-
-                    check_text(msg, "普通对话 (Op14)", file, offset)
-
-                    # 保留换行符(不保留的话请去除，Advhd支持自动换行)
-                    # msg = msg.replace("\\n", "") 
-
-                    if "name" in out.dic and out.dic["name"] == "":
-                        del out.dic["name"]
                     out.add_text(msg)
-                    # 去除末尾的控制符 %K %P
-                    out.dic["message"] = re.sub(r"[%KP]*$", "", out.dic["message"])
+                    # 同一条指令中有多个选项，以 (偏移量, 选项序号) 定位
+                    out.dic["ori_offset"] = offset
+                    out.dic["choice"] = choice
                     out.append_dict()
+                    choice += 1
 
-            # 提取选项 (Opcode 0F)
-            elif op == "0F":
-                for arg in c["args"]:
-                    # 只提取类型为 T 的内容
-                    if arg["type"] == "T":
-                        msg = arg["value"]
-
-                        check_text(msg, "选项 (Op0F)", file, offset)
-
-                        out.add_text(msg)
-                        out.append_dict()
-
-        out.save_json(os.path.join(outPath, file + ".json"))
-        info.update(out)
-
-    info.output(1)
+    return out
 
+def write_warning_report(warning_logs, oriPath):
     # 生成警告报告
     print("\n" + "="*50)
     if len(warning_logs) > 0:
@@ -107,6 +102,68 @@ def batch_dump(oriPath, outPath):
         print("未检测到任何包含特殊转义字符的文本...")
     print("="*50)
 
+def apply_tm(out, tm_path):
+    # 用翻译记忆预填译文，返回命中条数
+    if not tm_path or not out.outlist:
+        return 0
+    with TranslationMemory(tm_path) as tm:
+        return tm.apply(out.outlist)
+
+def dump_file(oriPath, outPath, file, use_cache=True, tm_path=None, with_entries=False):
+    # 处理单个文本，返回 (字数, 人名表, 警告列表, 翻译记忆命中数, 条目)，供父进程汇总
+    # 条目只在 with_entries 时返回 (写入分片)，否则为 None
+    warning_logs = []
+    try:
+        compiler = WS2FileCompiler(os.path.join(oriPath, file), "utf-8", use_cache)
+    except ValueError as e:
+        print(f"错误: 解析 {file} 失败 - {e}")
+        return 0, {}, [], 0, None
+    out = dump_commands(file, compiler.commands, warning_logs, oriPath)
+    hits = apply_tm(out, tm_path)
+
+    out.save_json(os.path.join(outPath, file + ".json"))
+    return out.textcount, out.get_names(), warning_logs, hits, out.outlist if with_entries else None
+
+def batch_dump(oriPath, outPath, use_cache=True, jobs=1, tm_path=None, shard_path=None, shard_count=4, shard_budget=None, shard_mode="chars"):
+    os.makedirs(outPath, exist_ok=True)
+    info = StatusInfo()
+    warning_logs = []
+
+    print(f"开始处理... 输入: {oriPath} -> 输出: {outPath}")
+    if tm_path:
+        print(f"   翻译记忆: {tm_path}")
+
+    # 指定分片路径时，每个脚本处理完立即按顺序写入分片
+    writer = open_shard_writer(shard_path, shard_count, shard_budget, shard_mode) if shard_path else None
+
+    files = [file for file in os.listdir(oriPath) if file.endswith(".txt")]
+    tasks = [(oriPath, outPath, file, use_cache, tm_path, writer is not None) for file in files]
+    tm_hits = 0
+    try:
+        for file, (textcount, names, logs, hits, entries) in zip(files, map_jobs(dump_file, tasks, jobs)):
+            #print(f"Processing {file}...")
+            info.update_counts(textcount, names)
+            warning_logs.extend(logs)
+            tm_hits += hits
+            if writer is not None and entries:
+                writer.add(file + ".json", entries)
+        if writer is not None:
+            writer.close()
+    except BaseException:
+        # 中断或出错时不留下不完整的分片
+        if writer is not None:
+            writer.discard()
+        raise
+
+    if writer is not None:
+        report_shards(writer, len(files))
+
+    info.output(1)
+    if tm_path:
+        print(f"翻译记忆命中: {tm_hits} 条 (已预填 message 并标记 \"tm\": true)")
+
+    write_warning_report(warning_logs, oriPath)
+
     print("所有步骤已完成...")
 
 def get_arg(value_from_args, prompt_text, default_val):
@@ -133,6 +190,13 @@ if __name__ == "__main__":
 
     parser.add_argument("-i", "--input", default=None, help="反编译的 .txt 文件输入路径")
     parser.add_argument("-o", "--output", default=None, help="输出路径")
+    parser.add_argument("--no-cache", action="store_true", help="不使用解析结果缓存 (__ws2cache__)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="并行进程数 (默认 1)")
+    parser.add_argument("--tm", default=None, help="翻译记忆数据库路径 (SQLite)，命中的条目预填译文")
+    parser.add_argument("--shards", default=None, help="同时输出均衡分片的文件夹路径 (合并见 shard.py merge)")
+    parser.add_argument("--shard-count", type=int, default=4, help="分片数 (默认 4，指定 --shard-budget 时忽略)")
+    parser.add_argument("--shard-budget", type=int, default=None, help="每片的字数/token 上限")
+    parser.add_argument("--shard-mode", choices=list(SHARD_WEIGHTS), default="chars", help="分片计量方式: chars / tokens (默认 chars)")
     
     args = parser.parse_args()
 
@@ -142,7 +206,7 @@ if __name__ == "__main__":
     final_input = get_arg(args.input, "请输入 .txt 文件夹路径", "Rio1_dec_dump")
     final_output = get_arg(args.output, "请输入输出路径", "Rio1_dec_dump_json")
 
-    batch_dump(final_input, final_output)
+    batch_dump(final_input, final_output, not args.no_cache, args.jobs, args.tm, args.shards, args.shard_count, args.shard_budget, args.shard_mode)
 
     if len(sys.argv) == 1:
         input("\n按回车键退出...")
\ No newline at end of file
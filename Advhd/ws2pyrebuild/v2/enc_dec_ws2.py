@@ -1,17 +1,12 @@
 from Lib import *
+from ws2codec import rotate_left_2, rotate_right_2, process_file
 import os
 
 def dec(data):
-    data = bytearray(data)
-    for i in range(len(data)):
-        data[i] = ((data[i] >> 2) + ((data[i] << 6)) & 0xFF)
-    return bytes(data)
+    return rotate_right_2(data)
 
 def enc(data):
-    data = bytearray(data)
-    for i in range(len(data)):
-        data[i] = ((data[i] << 2) + ((data[i] >> 6)) & 0xFF)
-    return bytes(data)
+    return rotate_left_2(data)
 
 if __name__ == "__main__":
     mode = input("请选择模式: 1. dec 2. enc: ")
@@ -23,11 +18,5 @@ if __name__ == "__main__":
     for file in os.listdir(oriPath):
         if file.endswith(".ws2"):
             print(f"Processing {file}...")
-            with open(os.path.join(oriPath, file), "rb") as f:
-                data = f.read()
-            
-            result_data = dec(data) if mode == "1" else enc(data)
-            
-            with open(os.path.join(outPath, file), "wb") as f:
-                f.write(result_data)
+            process_file(os.path.join(oriPath, file), os.path.join(outPath, file), "dec" if mode == "1" else "enc")
     print("操作完成。")
\ No newline at end of file
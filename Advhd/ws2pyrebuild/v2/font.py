@@ -0,0 +1,167 @@
+from Lib import *
+import os
+import shutil
+import hashlib
+import argparse
+import textwrap
+import sys
+
+# fontTools 为可选依赖，只有生成字体时才需要 (pip install fonttools)
+try:
+    from fontTools.ttLib import TTFont
+    from fontTools import subset
+except ImportError:
+    TTFont = None
+
+# 按字符集哈希缓存生成的字体，字体处理逻辑变化时需要修改版本号
+FONT_CACHE_DIR = "__fontcache__"
+FONT_CACHE_VERSION = 1
+
+# 始终保留的字符: 半角 ASCII 与全角空格
+BASE_CHARS = "".join(chr(c) for c in range(0x20, 0x7F)) + "　"
+
+# 从信息字体复制的 OS/2 字段 (与原 copyfontinfo 一致: otfcc 中以对象/字符串表示的字段)
+OS2_INFO_FIELDS = (
+    "achVendID", "panose", "fsType", "fsSelection",
+    "ulUnicodeRange1", "ulUnicodeRange2", "ulUnicodeRange3", "ulUnicodeRange4",
+    "ulCodePageRange1", "ulCodePageRange2",
+)
+
+def collect_charset(trans_path, namedict_path=None, extra_path=None):
+    # 收集所有译文 JSON (及人名表、额外文本) 中用到的字符
+    chars = set(BASE_CHARS)
+    for file in sorted(os.listdir(trans_path)):
+        if not file.endswith(".json"):
+            continue
+        data = open_json(os.path.join(trans_path, file))
+        if not isinstance(data, list):
+            continue
+        for item in data:
+            chars.update(item.get("name", ""))
+            chars.update(item.get("message", ""))
+    if namedict_path and os.path.exists(namedict_path):
+        for name in open_json(namedict_path).values():
+            chars.update(name)
+    if extra_path:
+        with open(extra_path, "r", encoding="utf-8") as f:
+            chars.update(f.read())
+    for ch in "\r\n\t":
+        chars.discard(ch)
+    return chars
+
+def get_font_key(chars, ori_font, info_provider, font_number):
+    # 缓存键: 字符集 + 原字体 + 信息字体 + 字体序号
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{FONT_CACHE_VERSION}|{font_number}|".encode())
+    h.update("".join(sorted(chars)).encode("utf-8", "surrogatepass"))
+    h.update((hash_file(ori_font) or "").encode())
+    h.update((hash_file(info_provider) or "").encode() if info_provider else b"-")
+    return h.hexdigest()
+
+def copy_font_info(font, info):
+    # 复制 name 表与 OS/2 的描述字段 (字体名、厂商、风格等)，字形与度量保持原字体
+    font["name"] = info["name"]
+    os2 = font["OS/2"]
+    info_os2 = info["OS/2"]
+    for field in OS2_INFO_FIELDS:
+        if hasattr(info_os2, field):
+            setattr(os2, field, getattr(info_os2, field))
+
+def build_font(ori_font, info_provider, outpath, chars=None, font_number=0):
+    # chars 为 None 时保留全部字形，只复制字体信息
+    if TTFont is None:
+        raise RuntimeError("需要 fontTools: pip install fonttools")
+    font = TTFont(ori_font, fontNumber=font_number)
+    if chars is not None:
+        options = subset.Options()
+        options.layout_features = ["*"]
+        options.name_IDs = ["*"]
+        options.name_languages = ["*"]
+        options.notdef_outline = True
+        options.font_number = font_number
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=[ord(ch) for ch in chars])
+        subsetter.subset(font)
+    if info_provider:
+        copy_font_info(font, TTFont(info_provider, fontNumber=font_number))
+    font.save(outpath)
+    font.close()
+
+def batch_font(ori_font, info_provider, trans_path, outpath, namedict_path=None, extra_path=None, use_cache=True, font_number=0):
+    print(f"\n>> Command: 生成子集字体")
+    print(f"   字体: {ori_font}")
+    print(f"   信息: {info_provider or '-'}")
+    print(f"   译文: {trans_path}")
+    print(f"   输出: {outpath}")
+
+    if TTFont is None:
+        print("[ERROR] 需要 fontTools，请先执行 pip install fonttools")
+        return
+    for path in (ori_font, trans_path):
+        if not os.path.exists(path):
+            print(f"[ERROR] 找不到输入: {path}")
+            return
+
+    chars = collect_charset(trans_path, namedict_path, extra_path)
+    print(f"  -> 共使用 {len(chars)} 个字符")
+
+    # 字符集、原字体与信息字体均未改变时直接使用缓存
+    key = get_font_key(chars, ori_font, info_provider, font_number)
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(outpath)), FONT_CACHE_DIR)
+    cache_path = os.path.join(cache_dir, key + os.path.splitext(outpath)[1])
+    if use_cache and os.path.exists(cache_path):
+        print(f"  -> 字符集未改变，使用缓存: {cache_path}")
+    else:
+        os.makedirs(cache_dir, exist_ok=True)
+        build_font(ori_font, info_provider, cache_path + ".tmp", chars, font_number)
+        os.replace(cache_path + ".tmp", cache_path)
+    shutil.copyfile(cache_path, outpath)
+
+    print(f"\n所有任务完成: {os.path.getsize(ori_font) / 1024:.0f} KB -> {os.path.getsize(outpath) / 1024:.0f} KB")
+
+def get_arg(value_from_args, prompt_text, default_val):
+    if value_from_args is not None:
+        return value_from_args
+
+    user_in = input(f"{prompt_text} (默认: {default_val}): ").strip()
+    if not user_in:
+        return default_val
+    return user_in.strip('"')
+
+if __name__ == "__main__":
+    desc_text = textwrap.dedent("""\
+    ================================================
+    AdvHD Font Subsetter
+    usage: python font.py [-i FONT] [-p PROVIDER] [-t TRANS] [-o OUTPUT]
+    """)
+
+    parser = argparse.ArgumentParser(
+        description=desc_text,
+        formatter_class=argparse.RawTextHelpFormatter,
+        usage=argparse.SUPPRESS
+    )
+
+    parser.add_argument("-i", "--input", default=None, help="原字体路径 (.ttf / .otf / .ttc)")
+    parser.add_argument("-p", "--provider", default=None, help="提供字体名等信息的字体路径 (游戏原字体)")
+    parser.add_argument("-t", "--trans", default=None, help="已翻译的 JSON 路径")
+    parser.add_argument("-o", "--output", default=None, help="输出字体路径")
+    parser.add_argument("-n", "--namedict", default=None, help="人名表路径")
+    parser.add_argument("-x", "--extra", default=None, help="额外需要保留的字符 (UTF-8 文本文件，如菜单文字)")
+    parser.add_argument("--font-number", type=int, default=0, help=".ttc 中的字体序号 (默认 0)")
+    parser.add_argument("--no-cache", action="store_true", help="不使用字体缓存 (__fontcache__)")
+
+    args = parser.parse_args()
+
+    if len(sys.argv) == 1:
+        print(desc_text)
+
+    final_font = get_arg(args.input, "请输入原字体路径", "font.ttf")
+    final_provider = get_arg(args.provider, "请输入信息字体路径 (留空则不复制)", "")
+    final_trans = get_arg(args.trans, "请输入已翻译的 JSON 路径", "Rio1_dec_dump_json_trans")
+    final_output = get_arg(args.output, "请输入输出字体路径", "font_subset.ttf")
+    final_dict = get_arg(args.namedict, "请输入人名表路径", "namedict_trans.json")
+
+    batch_font(final_font, final_provider or None, final_trans, final_output, final_dict, args.extra, not args.no_cache, args.font_number)
+
+    if len(sys.argv) == 1:
+        input("\n按回车键退出...")
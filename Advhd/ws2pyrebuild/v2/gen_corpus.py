@@ -0,0 +1,167 @@
+from WS2FILE import *
+import os
+import random
+import argparse
+import textwrap
+import sys
+
+# 随机生成合法的 .ws2 (已解密) 文件，用于在没有游戏文件时测试/测量各工具
+# 按 oplist.json 的解码计划逐条写出指令，I 跳转参数指向已生成指令的起始位置，保证可以反编译并原样编译回来
+
+# v1: CP932 字符串 (单字节 \x00 结尾)，v2: UTF-16LE 字符串 (\x00\x00 结尾)
+VARIANTS = {
+    "v1": ("cp932", os.path.join("..", "v1", "oplist.json")),
+    "v2": ("utf-16-le", "oplist.json"),
+}
+
+# 字符串使用的字符 (两种编码均可编码)，不包含反编译文本的分隔符 | 与换行
+TEXT_CHARS = (
+    "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをん"
+    "アイウエオカキクケコサシスセソタチツテトナニヌネノハヒフヘホマミムメモヤユヨラリルレロワヲン"
+    "日本語漢字先輩彼女秘密時間今日明日学校部屋気持言葉"
+    "、。「」『』！？…―～・♪"
+)
+ASCII_CHARS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-. "
+
+# 文本相关指令的出现比例，其余指令平分剩余比例
+TEXT_OP_WEIGHTS = {0x14: 0.30, 0x15: 0.20, 0x0F: 0.02}
+
+class CorpusGenerator:
+    def __init__(self, seed=0, encoding="utf-16-le", oplist_path="oplist.json"):
+        self.rng = random.Random(seed)
+        self.encoding = encoding
+        self.end_char = b"\x00\x00" if "16" in encoding else b"\x00"
+        _, self.plans = load_plans(oplist_path)
+        self.text_ops = [(op, weight) for op, weight in TEXT_OP_WEIGHTS.items() if op in self.plans]
+        self.other_ops = [op for op in self.plans if op not in TEXT_OP_WEIGHTS]
+
+    def random_text(self, max_length, chars=TEXT_CHARS):
+        rng = self.rng
+        return "".join(rng.choice(chars) for _ in range(rng.randint(0, max_length)))
+
+    def random_str(self, op, m):
+        # 按指令生成接近真实脚本的字符串: 人名带 %LC，对话带 %K%P 与 \n，其余为资源名等短字符串
+        rng = self.rng
+        if m == "T" and op == 0x15:
+            return rng.choice(["", "%LC" + self.random_text(6)])
+        if m == "T" and op == 0x14:
+            lines = [self.random_text(30) for _ in range(rng.randint(1, 3))]
+            return "\\n".join(lines) + rng.choice(["%K%P", "%K", "%P", ""])
+        if m == "T":
+            return self.random_text(16)
+        return self.random_text(12, ASCII_CHARS)
+
+    def choose_op(self):
+        rng = self.rng
+        r = rng.random()
+        for op, weight in self.text_ops:
+            if r < weight:
+                return op
+            r -= weight
+        return rng.choice(self.other_ops)
+
+    def write_plan(self, out, plan, op, jumps):
+        rng = self.rng
+        for kind, a, b in plan:
+            if kind == STEP_FIXED:
+                # a: struct.Struct, b: 类型串，I 先写入占位，最后统一指向某条指令
+                values = []
+                pos = len(out)
+                for m in b:
+                    if m == "I":
+                        jumps.append(pos)
+                        values.append(0)
+                    else:
+                        values.append(rng.getrandbits(FIXED_SIZES[m] * 8))
+                    pos += FIXED_SIZES[m]
+                out += a.pack(*values)
+            elif kind == STEP_STR:
+                out += self.random_str(op, a).encode(self.encoding) + self.end_char
+            elif kind == STEP_LIST:
+                length = rng.randint(0, 4)
+                out.append(length)
+                for _ in range(length):
+                    if b is None:
+                        out += self.random_str(op, a).encode(self.encoding) + self.end_char
+                    else:
+                        if a == "I":
+                            jumps.append(len(out))
+                        out += struct.pack("<" + b, 0 if a == "I" else rng.getrandbits(FIXED_SIZES[a] * 8))
+            else:
+                length = rng.randint(0, 3)
+                out.append(length)
+                for _ in range(length):
+                    self.write_plan(out, a, op, jumps)
+
+    def generate(self, size):
+        # 生成至少 size 字节的脚本
+        out = bytearray()
+        starts = []
+        jumps = []
+        while len(out) < size:
+            op = self.choose_op()
+            starts.append(len(out))
+            out.append(op)
+            self.write_plan(out, self.plans[op], op, jumps)
+        for pos in jumps:
+            U32.pack_into(out, pos, self.rng.choice(starts))
+        return bytes(out)
+
+def generate_corpus(out_path, count, size, seed=0, variant="v2", oplist_path=None):
+    # 生成 count 个约 size 字节的 .ws2，返回文件名列表
+    encoding, default_oplist = VARIANTS[variant]
+    if oplist_path is None:
+        oplist_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), default_oplist)
+    os.makedirs(out_path, exist_ok=True)
+    files = []
+    for i in range(count):
+        file = f"corpus_{i:04d}.ws2"
+        data = CorpusGenerator(seed + i, encoding, oplist_path).generate(size)
+        save_file_b(os.path.join(out_path, file), data)
+        files.append(file)
+    return files
+
+def get_arg(value_from_args, prompt_text, default_val):
+    if value_from_args is not None:
+        return value_from_args
+
+    user_in = input(f"{prompt_text} (默认: {default_val}): ").strip()
+    if not user_in:
+        return default_val
+    return user_in.strip('"')
+
+if __name__ == "__main__":
+    desc_text = textwrap.dedent("""\
+    ================================================
+    AdvHD WS2 Corpus Generator
+    usage: python gen_corpus.py [-o OUTPUT] [-n COUNT] [-s SIZE_KB] [--variant v1|v2]
+    """)
+
+    parser = argparse.ArgumentParser(
+        description=desc_text,
+        formatter_class=argparse.RawTextHelpFormatter,
+        usage=argparse.SUPPRESS
+    )
+
+    parser.add_argument("-o", "--output", default=None, help="输出文件夹路径")
+    parser.add_argument("-n", "--count", type=int, default=10, help="生成的文件数 (默认 10)")
+    parser.add_argument("-s", "--size", type=int, default=256, help="每个文件的大小 KB (默认 256)")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子 (默认 0)，相同参数生成相同的文件")
+    parser.add_argument("--variant", choices=list(VARIANTS), default="v2", help="v1: CP932 字符串 / v2: UTF-16LE 字符串 (默认 v2)")
+    parser.add_argument("-p", "--oplist", default=None, help="oplist.json 路径 (默认按 variant 选择 v1/v2 的 oplist.json)")
+
+    args = parser.parse_args()
+
+    if len(sys.argv) == 1:
+        print(desc_text)
+
+    final_output = get_arg(args.output, "请输入输出文件夹路径", "corpus")
+
+    print(f"\n>> Command: 生成测试脚本")
+    print(f"   输出: {final_output}")
+    print(f"   数量: {args.count} x {args.size} KB ({args.variant}, {VARIANTS[args.variant][0]})")
+    files = generate_corpus(final_output, args.count, args.size * 1024, args.seed, args.variant, args.oplist)
+    print(f"\n所有任务完成，共生成 {len(files)} 个文件。")
+
+    if len(sys.argv) == 1:
+        input("\n按回车键退出...")
@@ -0,0 +1,140 @@
+from Lib import *
+from WS2FILE import *
+from arc import ArcVFS
+from dump import DUMP_OPS, dump_commands, write_warning_report
+from tm import TranslationMemory
+from shard import open_shard_writer, report_shards
+import os
+import argparse
+import textwrap
+import sys
+
+def pipeline_extract(arc_path, outPath, debug_path=None, do_decrypt=True, tm_path=None, shard_path=None, shard_count=4, shard_budget=None, shard_mode="chars"):
+    # .arc -> 解密 -> 反编译 -> 提取 全部在内存中完成，只写出最终的 .json
+    # arc_path 可以是多个 .arc 的列表，按 ArcVFS 合并 (后面的封包优先)，只读取其中的 .ws2
+    # debug_path 不为空时额外输出中间结果 (解密后的 .ws2 与反编译文本)
+    arc_paths = [arc_path] if isinstance(arc_path, str) else list(arc_path)
+    arc_path = " + ".join(arc_paths)
+    print(f"\n>> Command: Pipeline Extract")
+    print(f"   输入: {arc_path}")
+    print(f"   输出: {outPath}")
+    print(f"   解密: {'是' if do_decrypt else '否'}")
+    if debug_path:
+        print(f"   调试: {debug_path}")
+    if tm_path:
+        print(f"   翻译记忆: {tm_path}")
+
+    for path in arc_paths:
+        if not os.path.exists(path):
+            print(f"[ERROR] 找不到输入文件: {path}")
+            return
+
+    os.makedirs(outPath, exist_ok=True)
+    if debug_path:
+        os.makedirs(debug_path, exist_ok=True)
+
+    info = StatusInfo()
+    warning_logs = []
+    count = 0
+    tm_hits = 0
+    tm = TranslationMemory(tm_path) if tm_path else None
+    # 指定分片路径时，每个脚本提取完立即写入分片
+    writer = open_shard_writer(shard_path, shard_count, shard_budget, shard_mode) if shard_path else None
+
+    try:
+        with ArcVFS(arc_paths) as reader:
+            for name in reader.list():
+                if not name.lower().endswith(".ws2"):
+                    continue
+                # 与 decompile.py / dump.py 的命名保持一致，trans.py 可以直接使用
+                file = os.path.basename(name) + ".txt"
+                try:
+                    data = reader.read(name, decrypt=do_decrypt)
+                    # 只输出 .json 时仅解码 dump 用到的人名/对话/选项指令
+                    commands = list(WS2FileDumper(data).iter_commands(None if debug_path else DUMP_OPS))
+
+                    if debug_path:
+                        save_file_b(os.path.join(debug_path, os.path.basename(name)), data)
+                        with open(os.path.join(debug_path, file), "w", encoding="utf-8") as f:
+                            for command in commands:
+                                f.write(format_command(command) + "\n")
+
+                    out = dump_commands(file, commands, warning_logs, arc_path)
+                    if tm is not None:
+                        tm_hits += tm.apply(out.outlist)
+                    out.save_json(os.path.join(outPath, file + ".json"))
+                    if writer is not None and out.outlist:
+                        writer.add(file + ".json", out.outlist)
+                    info.update(out)
+                    count += 1
+
+                except Exception as e:
+                    print(f"  [ERROR] 处理 {name} 失败: {e}")
+        if writer is not None:
+            writer.close()
+    except BaseException:
+        # 中断或出错时不留下不完整的分片
+        if writer is not None:
+            writer.discard()
+        raise
+
+    if writer is not None:
+        report_shards(writer, count)
+
+    info.output(1)
+    if tm is not None:
+        tm.close()
+        print(f"翻译记忆命中: {tm_hits} 条 (已预填 message 并标记 \"tm\": true)")
+
+    write_warning_report(warning_logs, arc_path)
+
+    print(f"\n所有任务完成，共处理 {count} 个文件。")
+
+def get_arg(value_from_args, prompt_text, default_val):
+    if value_from_args is not None:
+        return value_from_args
+
+    user_in = input(f"{prompt_text} (默认: {default_val}): ").strip()
+    if not user_in:
+        return default_val
+    return user_in.strip('"')
+
+if __name__ == "__main__":
+    desc_text = textwrap.dedent("""\
+    ================================================
+    AdvHD WS2 Pipeline (.arc -> .json)
+    usage: python pipeline.py <command> [-i INPUT] [-o OUTPUT] [options]
+    """)
+
+    parser = argparse.ArgumentParser(
+        description=desc_text,
+        formatter_class=argparse.RawTextHelpFormatter,
+        usage=argparse.SUPPRESS
+    )
+
+    subparsers = parser.add_subparsers(dest='command', title="Available Commands", metavar="")
+
+    # Extract
+    p_extract = subparsers.add_parser('extract', help='从 .arc 直接提取文本 .json (解密/反编译/dump 一步完成)')
+    p_extract.add_argument('-i', '--input', nargs='+', default=None, help='输入 .arc 文件路径，可指定多个 (如 Rio1.arc Rio2.arc 补丁.arc，后面的优先)')
+    p_extract.add_argument('-o', '--output', default=None, help='输出 .json 文件夹路径')
+    p_extract.add_argument('-d', '--debug', default=None, help='中间结果 (解密 .ws2 / 反编译 .txt) 输出路径，默认不输出')
+    p_extract.add_argument('--no-decrypt', action='store_true', help='封包内的 .ws2 未加密时使用')
+    p_extract.add_argument('--tm', default=None, help='翻译记忆数据库路径 (SQLite)，命中的条目预填译文')
+    p_extract.add_argument('--shards', default=None, help='同时输出均衡分片的文件夹路径 (合并见 shard.py merge)')
+    p_extract.add_argument('--shard-count', type=int, default=4, help='分片数 (默认 4，指定 --shard-budget 时忽略)')
+    p_extract.add_argument('--shard-budget', type=int, default=None, help='每片的字数/token 上限')
+    p_extract.add_argument('--shard-mode', choices=list(SHARD_WEIGHTS), default='chars', help='分片计量方式: chars / tokens (默认 chars)')
+
+    args = parser.parse_args()
+
+    if args.command == 'extract':
+        final_input = get_arg(args.input, "输入 .arc 文件路径", "Rio1.arc")
+        final_output = get_arg(args.output, "输出 .json 文件夹路径", "Rio1_dec_dump_json")
+        pipeline_extract(final_input, final_output, args.debug, not args.no_decrypt, args.tm, args.shards, args.shard_count, args.shard_budget, args.shard_mode)
+
+    else:
+        parser.print_help()
+
+    if len(sys.argv) < 2:
+        input("\n按回车键退出...")
@@ -0,0 +1,141 @@
+from Lib import *
+import os
+import argparse
+import textwrap
+import sys
+
+# 把 dump 得到的各脚本 .json 按 message 字数 (或估算 token 数) 均衡地切分为若干分片，供多人/多批次并行翻译
+# 分片文件夹中的 shards.index (JSON 格式) 记录每个分片包含哪些脚本的哪段条目，翻译完成后据此合并回各脚本的 .json
+
+def list_json_files(json_path):
+    return [file for file in sorted(os.listdir(json_path)) if file.endswith(".json")]
+
+def open_shard_writer(out_path, count=None, budget=None, mode="chars"):
+    # 指定 budget 时按预算切分，否则均分为 count 片
+    unit = '字数' if mode == 'chars' else '估算 token'
+    if budget is None:
+        print(f"   分片: {out_path} (均分为 {count} 片，按{unit})")
+        return JsonShardWriter(out_path, mode=mode, count=count)
+    print(f"   分片: {out_path} (每片上限 {budget} {unit})")
+    return JsonShardWriter(out_path, budget, mode)
+
+def report_shards(writer, source_count):
+    for shard in writer.shards:
+        print(f"  -> {shard['file']}: {shard['count']} 条, {shard['weight']} {writer.mode}, 来自 {len(shard['sources'])} 个脚本")
+    if writer.shards:
+        weights = [shard["weight"] for shard in writer.shards]
+        print(f"分片完成: {source_count} 个脚本切分为 {len(writer.shards)} 个分片 (最大 {max(weights)} / 最小 {min(weights)})，索引: {os.path.join(writer.out_path, writer.index_name)}")
+
+def shard_split(json_path, out_path, count=None, budget=None, mode="chars"):
+    print(f"\n>> Command: 切分分片")
+    print(f"   输入: {json_path}")
+    print(f"   输出: {out_path}")
+
+    if not os.path.exists(json_path):
+        print(f"[ERROR] 输入文件夹不存在: {json_path}")
+        return
+
+    # 逐个文件读取并写出，不同时保留全部条目
+    files = list_json_files(json_path)
+    with open_shard_writer(out_path, count, budget, mode) as writer:
+        for file in files:
+            writer.add(file, open_json(os.path.join(json_path, file)))
+    report_shards(writer, len(files))
+
+def shard_merge(shard_path, out_path, index_name="shards.index"):
+    print(f"\n>> Command: 合并分片")
+    print(f"   输入: {shard_path}")
+    print(f"   输出: {out_path}")
+
+    index_path = os.path.join(shard_path, index_name)
+    if not os.path.exists(index_path):
+        print(f"[ERROR] 找不到分片索引: {index_path}")
+        return
+    index = open_json(index_path)
+    if index.get("version") != JsonShardWriter.INDEX_VERSION:
+        print(f"[ERROR] 不支持的分片索引版本: {index.get('version')}")
+        return
+
+    os.makedirs(out_path, exist_ok=True)
+    sources = index["sources"]
+    # 同一脚本的条目在相邻分片中连续，凑齐一个脚本即写出
+    pending = {}
+    count = 0
+    for shard in index["shards"]:
+        entries = open_json(os.path.join(shard_path, shard["file"]))
+        if len(entries) != shard["count"]:
+            print(f"[ERROR] {shard['file']} 条目数 {len(entries)} 与索引中的 {shard['count']} 不一致，请检查是否有增删条目。")
+            return
+        pos = 0
+        for part in shard["sources"]:
+            source = part["source"]
+            merged = pending.setdefault(source, [])
+            if len(merged) != part["start"]:
+                print(f"[ERROR] {source} 的条目顺序与索引不一致 ({shard['file']})")
+                return
+            merged.extend(entries[pos:pos + part["count"]])
+            pos += part["count"]
+            if len(merged) == sources[source]:
+                save_json(os.path.join(out_path, source), merged)
+                del pending[source]
+                count += 1
+
+    for source in pending:
+        print(f"[ERROR] {source} 的条目不完整，缺少部分分片。")
+
+    print(f"\n所有任务完成，共合并 {count} 个脚本。")
+
+def get_arg(value_from_args, prompt_text, default_val):
+    if value_from_args is not None:
+        return value_from_args
+
+    user_in = input(f"{prompt_text} (默认: {default_val}): ").strip()
+    if not user_in:
+        return default_val
+    return user_in.strip('"')
+
+if __name__ == "__main__":
+    desc_text = textwrap.dedent("""\
+    ================================================
+    AdvHD JSON Sharding
+    usage: python shard.py <command> [-i INPUT] [-o OUTPUT] [options]
+    """)
+
+    parser = argparse.ArgumentParser(
+        description=desc_text,
+        formatter_class=argparse.RawTextHelpFormatter,
+        usage=argparse.SUPPRESS
+    )
+
+    subparsers = parser.add_subparsers(dest='command', title="Available Commands", metavar="")
+
+    # Split
+    p_split = subparsers.add_parser('split', help='把各脚本的 .json 按字数/token 均衡切分为分片')
+    p_split.add_argument('-i', '--input', default=None, help='dump 得到的 .json 文件夹路径')
+    p_split.add_argument('-o', '--output', default=None, help='分片输出文件夹路径')
+    p_split.add_argument('-n', '--count', type=int, default=4, help='分片数 (默认 4，指定 -b 时忽略)')
+    p_split.add_argument('-b', '--budget', type=int, default=None, help='每片的字数/token 上限 (按预算切分，分片数不固定)')
+    p_split.add_argument('-m', '--mode', choices=list(SHARD_WEIGHTS), default="chars", help='计量方式: chars 为 message 字数，tokens 为估算的 token 数 (默认 chars)')
+
+    # Merge
+    p_merge = subparsers.add_parser('merge', help='按分片索引把翻译后的分片合并回各脚本的 .json')
+    p_merge.add_argument('-i', '--input', default=None, help='分片文件夹路径 (含 shards.index)')
+    p_merge.add_argument('-o', '--output', default=None, help='合并后的 .json 输出文件夹路径')
+
+    args = parser.parse_args()
+
+    if args.command == 'split':
+        final_input = get_arg(args.input, "请输入 .json 文件夹路径", "Rio1_dec_dump_json")
+        final_output = get_arg(args.output, "请输入分片输出路径", "Rio1_shards")
+        shard_split(final_input, final_output, args.count, args.budget, args.mode)
+
+    elif args.command == 'merge':
+        final_input = get_arg(args.input, "请输入分片文件夹路径", "Rio1_shards")
+        final_output = get_arg(args.output, "请输入合并后的 .json 输出路径", "Rio1_dec_dump_json_trans")
+        shard_merge(final_input, final_output)
+
+    else:
+        parser.print_help()
+
+    if len(sys.argv) < 2:
+        input("\n按回车键退出...")
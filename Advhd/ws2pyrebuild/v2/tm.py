@@ -0,0 +1,112 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+
+# 跨作品的翻译记忆 (精确匹配)
+# 以规范化后原文的哈希为键保存 (原文, 译文)，dump.py 用其预填 message，trans.py 把人工确认的译文写回
+
+# SQLite 单条语句的参数个数有上限，批量查询时分组
+QUERY_BATCH = 500
+
+TM_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tm (
+    hash TEXT PRIMARY KEY,
+    ori TEXT NOT NULL,
+    message TEXT NOT NULL,
+    updated INTEGER NOT NULL
+)
+"""
+
+def normalize(text):
+    # 去除尾部控制符 %K %P 与首尾空白 (选项前后的空格)，同一句话在不同位置得到相同的键
+    return re.sub(r"[%KP]*$", "", text).strip()
+
+def tm_key(text):
+    return hashlib.blake2b(normalize(text).encode("utf-8"), digest_size=16).hexdigest()
+
+class TranslationMemory:
+    def __init__(self, path):
+        self.path = path
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        # 多进程同时读取时等待写锁释放
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute(TM_SCHEMA)
+        self.conn.commit()
+
+    def lookup_many(self, oris):
+        # 返回 {规范化原文: 译文}，哈希相同但原文不同 (碰撞) 的记录不会命中
+        keys = {tm_key(ori): normalize(ori) for ori in oris}
+        res = {}
+        hashes = list(keys)
+        for i in range(0, len(hashes), QUERY_BATCH):
+            batch = hashes[i:i + QUERY_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(f"SELECT hash, ori, message FROM tm WHERE hash IN ({placeholders})", batch)
+            for h, ori, message in rows:
+                if keys[h] == ori:
+                    res[ori] = message
+        return res
+
+    def lookup(self, ori):
+        return self.lookup_many([ori]).get(normalize(ori))
+
+    def apply(self, entries):
+        # 用翻译记忆预填 dump 的条目 (原文保存在 "ori" 中)，返回命中数
+        # 命中的条目标记 "tm": true，并在 "tm_message" 中保留预填的译文，写回时据此判断是否被人工改动
+        found = self.lookup_many([entry["ori"] for entry in entries if "ori" in entry])
+        hits = 0
+        for entry in entries:
+            message = found.get(normalize(entry.get("ori", "")))
+            if message is not None:
+                entry["message"] = message
+                entry["tm"] = True
+                entry["tm_message"] = message
+                hits += 1
+        return hits
+
+    def update_from(self, entries):
+        # 只写回经过人工确认的译文，未校对的机翻不会进入记忆，返回写入数:
+        #   1. 带有 "confirmed": true 或 "reviewed": true 标记的条目
+        #   2. 由翻译记忆预填 ("tm": true) 且译文与预填时 ("tm_message") 不同的条目
+        # 预填后未改动的条目不写回，即使记忆中的译文已被其他作品更新
+        # 同一原文以最新的译文为准
+        candidates = []
+        for entry in entries:
+            ori = entry.get("ori")
+            message = entry.get("message")
+            if not ori or not message or normalize(message) == normalize(ori):
+                continue
+            if entry.get("confirmed") is True or entry.get("reviewed") is True:
+                candidates.append((ori, message))
+            elif entry.get("tm") is True and "tm_message" in entry and message != entry["tm_message"]:
+                candidates.append((ori, message))
+        if not candidates:
+            return 0
+
+        # 与记忆中的译文相同的条目无需重复写入
+        found = self.lookup_many([ori for ori, _ in candidates])
+        now = int(time.time())
+        rows = {}
+        for ori, message in candidates:
+            key = normalize(ori)
+            if found.get(key) == message:
+                continue
+            rows[key] = (tm_key(ori), key, message, now)
+        self.conn.executemany("INSERT OR REPLACE INTO tm (hash, ori, message, updated) VALUES (?, ?, ?, ?)", list(rows.values()))
+        self.conn.commit()
+        return len(rows)
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM tm").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -1,13 +1,329 @@
 from Lib import *
 from WS2FILE import *
 from enc_dec_ws2 import *
+from tm import TranslationMemory
 import os
 import re
 import argparse
 import sys
 import textwrap
 
-def batch_trans(oriPath, transPath, outPath, namedict_path):
+# 默认编译目标编码 (-e 936 为 GBK 版本)
+ENCODING = "utf-16-le"
+
+# 构建清单版本号，回填/编译逻辑变化导致输出不同时需要修改，清单中的记录将全部失效
+MANIFEST_VERSION = 1
+
+def get_output_path(outPath, file):
+    # xxx.ws2.txt -> outPath/xxx.ws2
+    ws2_out_path = os.path.join(outPath, file.replace(".txt", ""))
+    if not ws2_out_path.endswith(".ws2"):
+         ws2_out_path += ".ws2"
+    return ws2_out_path
+
+class TransLookup:
+    # 译文查找: 条目带有 ori_offset 时按 (偏移量, 选项序号) 建立索引，O(1) 查找
+    # 旧版 JSON (没有 ori_offset) 退回按顺序逐条读取
+    def __init__(self, transdatas):
+        self.by_offset = None
+        self.sequence = None
+        if transdatas and all("ori_offset" in t for t in transdatas):
+            self.by_offset = {(t["ori_offset"], t.get("choice", 0)): t for t in transdatas}
+        else:
+            self.sequence = iter(transdatas)
+            self.total = len(transdatas)
+            self.used = 0
+
+    def get(self, ori_offset, choice=0, expected=True):
+        # expected: dump 时该位置是否会产生条目，仅在顺序模式下决定是否消耗一条译文
+        if self.by_offset is not None:
+            return self.by_offset.pop((ori_offset, choice), None)
+        if not expected:
+            return None
+        transdata = next(self.sequence, None)
+        if transdata is not None:
+            self.used += 1
+        return transdata
+
+    def remaining(self):
+        if self.by_offset is not None:
+            return len(self.by_offset)
+        return self.total - self.used
+
+def load_transdatas(json_path):
+    try:
+        return open_json(json_path)
+    except FileNotFoundError:
+        print(f"警告: 找不到翻译文件 {os.path.basename(json_path)}，将直接打包原文本。")
+        return []
+
+def get_json_path(transPath, file):
+    # 文本模式: xxx.ws2.txt -> xxx.ws2.txt.json；补丁模式: xxx.ws2 -> xxx.ws2.txt.json
+    if file.endswith(".ws2"):
+        file += ".txt"
+    return os.path.join(transPath, file + ".json")
+
+def trans_name(ori_name, namedict):
+    # 回填人名，不需要替换时返回 None
+    # 去除标记查找
+    clean_name = ori_name.replace("%LC", "")
+    if not clean_name:
+        return None
+    # 查字典替换，没有则用原名
+    new_name = namedict.get(clean_name, clean_name)
+    # 重新加上 %LC
+    return "%LC" + new_name
+
+def get_check_val(ori_msg):
+    # 去除换行符与尾部控制符后为空的对话，dump 时不会产生条目 (旧版 JSON 顺序模式下依此跳过)
+    check_val = ori_msg.replace("\\n", "")
+    return re.sub(r"[%KP]*$", "", check_val)
+
+def trans_message(ori_msg, transmsg):
+    # 换行符修复
+    transmsg = transmsg.replace("\n", "\\n")
+    
+    # 控制符补全
+    # 先清理翻译可能自带的尾部控制符
+    transmsg = re.sub(r"[%KP]*$", "", transmsg)
+    # 从原文提取尾部控制符
+    match = re.search(r"[%KP]+$", ori_msg)
+    if match:
+        transmsg += match.group(0)
+    return transmsg
+
+def trans_choice(transmsg):
+    # 换行符修复
+    transmsg = transmsg.replace("\n", "\\n")
+    # 选项处理: 前后加空格
+    return "  " + transmsg.strip() + "  "
+
+def check_remaining(lookup, file):
+    # 检查是否有未使用的翻译
+    remaining = lookup.remaining()
+    if remaining > 0:
+        print(f"严重警告: {file} 处理结束后，仍有 {remaining} 条翻译未被使用。")
+        if lookup.by_offset is None:
+            print(f"这意味着 dump 和 trans 的过滤逻辑不一致，或者翻译文件行数对不上。")
+        else:
+            print(f"这意味着这些条目的 ori_offset 在原文中不存在，请确认译文与反编译文本是否对应。")
+
+def backfill_file(oriPath, transPath, namedict, file, use_cache=True, encoding=ENCODING):
+    # 读取反编译文本并回填译文，返回 WS2FileCompiler
+
+    # 读取译文数据
+    transdatas = load_transdatas(get_json_path(transPath, file))
+
+    ws2f = WS2FileCompiler(os.path.join(oriPath, file), encoding, use_cache)
+    lookup = TransLookup(transdatas)
+
+    # 遍历指令进行回填
+    for c in ws2f.commands:
+        op = c.op
+        # 回填人名 (Opcode 15)
+        if op == 0x15:
+            if len(c.values) > 0:
+                new_name = trans_name(c.values[0], namedict)
+                if new_name is not None:
+                    c.values[0] = new_name
+
+        # 回填对话 (Opcode 14)
+        elif op == 0x14:
+            # 只处理 T，Op14 通常只有一段文本，只处理第一个
+            i = c.find(TYPE_T)
+            if i != -1:
+                ori_msg = c.values[i]
+                check_val = get_check_val(ori_msg)
+                
+                transdata = lookup.get(c.ori_offset, 0, check_val != "")
+                if transdata is not None:
+                    c.values[i] = trans_message(ori_msg, transdata["message"])
+                elif check_val != "":
+                    print(f"警告: {file} 翻译条目不足 (Op14, Line {c.ori_offset})")
+
+        # 回填选项 (Opcode 0F)
+        elif op == 0x0F:
+            choice = 0
+            i = c.find(TYPE_T)
+            while i != -1:
+                transdata = lookup.get(c.ori_offset, choice)
+                if transdata is not None:
+                    c.values[i] = trans_choice(transdata["message"])
+                elif lookup.by_offset is None or c.values[i] != "":
+                    print(f"警告: {file} 翻译条目不足 (Op0F, Line {c.ori_offset})")
+                choice += 1
+                i = c.find(TYPE_T, i + 1)
+
+    check_remaining(lookup, file)
+    return ws2f
+
+def save_compiled(ws2f, ws2_out_path, file):
+    # 编译回填后的指令并保存，成功返回 True
+    try:
+        ws2f.preCompile()
+        data = ws2f.compile_bytes()
+        
+        # 加密
+        #data = enc(data) 
+        
+        save_file_b(ws2_out_path, data)
+        #print(f"Build: {ws2_out_path}")
+        return True
+            
+    except Exception as e:
+        print(f"错误: 编译 {file} 失败 - {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def trans_file(oriPath, transPath, outPath, namedict, file, use_cache=True, encoding=ENCODING):
+    # 回填并编译单个文件，成功返回 True
+    try:
+        ws2f = backfill_file(oriPath, transPath, namedict, file, use_cache, encoding)
+    except Exception as e:
+        print(f"错误: 编译 {file} 失败 - {e}")
+        return False
+    # 加上 .ws2 后缀保存
+    return save_compiled(ws2f, get_output_path(outPath, file), file)
+
+def get_staged_path(outPath, file):
+    return get_output_path(outPath, file) + ".tmp"
+
+def trans_file_checked(oriPath, transPath, outPath, namedict, file, use_cache=True, encoding=ENCODING):
+    # 非 UTF 编码: 只回填一次，先检查能否编码，可以编码时编译到临时文件 (.tmp)，由 batch_trans 在全部文件通过后替换
+    # 返回 (成功与否, 无法编码的 [(偏移量, 字符, 文本)])
+    try:
+        ws2f = backfill_file(oriPath, transPath, namedict, file, use_cache, encoding)
+    except Exception as e:
+        print(f"错误: 编译 {file} 失败 - {e}")
+        return False, []
+    problems = ws2f.find_unencodable()
+    if problems:
+        return False, problems
+    return save_compiled(ws2f, get_staged_path(outPath, file), file), []
+
+def report_unencodable(outPath, encoding, results):
+    # results: [(文件名, 无法编码的 [(偏移量, 字符, 文本)])]，全部可编码时返回 True，否则输出报告
+    problems = []
+    chars = {}
+    for file, res in results:
+        for offset, bad, text in res:
+            problems.append(f"{file} @{offset} [{' '.join(bad)}] {text}")
+            for ch in bad:
+                chars[ch] = chars.get(ch, 0) + 1
+    if not problems:
+        return True
+
+    report_path = os.path.normpath(outPath) + ".encoding_report.txt"
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write(f"目标编码: {encoding}\n")
+        f.write(f"无法编码的字符 (出现次数): {' '.join(f'{ch}(U+{ord(ch):04X})x{n}' for ch, n in chars.items())}\n")
+        f.write(f"说明: 请在原文文本中搜索 '@偏移量' 定位，修改译文或在 Lib.GBK_SYMBOL_TABLE 中添加替换。\n\n")
+        f.write("\n".join(problems) + "\n")
+    print(f"错误: {len(problems)} 处文本包含 {encoding} 无法编码的字符: {' '.join(chars)}")
+    for line in problems[:20]:
+        print(f"  {line}")
+    if len(problems) > 20:
+        print(f"  ... 其余 {len(problems) - 20} 处")
+    print(f"完整报告: {report_path}，未写入任何文件。")
+    return False
+
+def patch_file(oriPath, transPath, outPath, namedict, file, use_cache=True, encoding=ENCODING):
+    # 补丁模式: 直接在已解密的 .ws2 上替换字符串并修正跳转，成功返回 True
+    # 回填规则与 trans_file 相同，但手动修改过的反编译文本不会生效
+    transdatas = load_transdatas(get_json_path(transPath, file))
+    lookup = TransLookup(transdatas)
+
+    try:
+        patcher = WS2FilePatcher(open_file_b(os.path.join(oriPath, file)), encoding)
+    except Exception as e:
+        print(f"错误: 解析 {file} 失败 - {e}")
+        return False
+
+    for offset, op, index, start, end, value in patcher.strings:
+        # 回填人名 (Opcode 15)
+        if op == 0x15 and index == 0:
+            new_name = trans_name(value, namedict)
+            if new_name is not None:
+                patcher.replace(start, end, new_name)
+
+        # 回填对话 (Opcode 14)，只处理第一段文本
+        elif op == 0x14 and index == 0:
+            check_val = get_check_val(value)
+            transdata = lookup.get(offset, 0, check_val != "")
+            if transdata is not None:
+                patcher.replace(start, end, trans_message(value, transdata["message"]))
+            elif check_val != "":
+                print(f"警告: {file} 翻译条目不足 (Op14, Line {offset})")
+
+        # 回填选项 (Opcode 0F)
+        elif op == 0x0F:
+            transdata = lookup.get(offset, index)
+            if transdata is not None:
+                patcher.replace(start, end, trans_choice(transdata["message"]))
+            elif lookup.by_offset is None or value != "":
+                print(f"警告: {file} 翻译条目不足 (Op0F, Line {offset})")
+
+    check_remaining(lookup, file)
+
+    try:
+        save_file_b(get_output_path(outPath, file), patcher.build())
+        return True
+    except Exception as e:
+        print(f"错误: 写入 {file} 失败 - {e}")
+        return False
+
+def get_manifest_path(outPath):
+    # 清单放在输出文件夹旁边，避免被一起打包
+    return os.path.normpath(outPath) + ".manifest.json"
+
+def forget_manifest_entries(outPath, files):
+    # 从构建清单中去掉若干脚本，下次编译时视为已改动 (编译结果未能送达目标时使用)
+    manifest_path = get_manifest_path(outPath)
+    if not os.path.exists(manifest_path):
+        return
+    manifest = open_json(manifest_path)
+    records = manifest.get("files", {})
+    for file in files:
+        records.pop(file, None)
+    save_json(manifest_path, manifest)
+
+def get_input_hashes(oriPath, transPath, file, namedict_hash, patch=False, encoding=ENCODING):
+    # 决定单个脚本输出的全部输入 (补丁模式下 "txt" 为原始 .ws2 的哈希)
+    return {
+        "txt": hash_file(os.path.join(oriPath, file)),
+        "json": hash_file(get_json_path(transPath, file)),
+        "namedict": namedict_hash,
+        "encoding": encoding,
+        "mode": "patch" if patch else "compile",
+    }
+
+def get_rebuild_reason(record, inputs, output_path):
+    # 返回需要重新编译的原因，输入均未改动时返回 None
+    if record is None:
+        return "新文件"
+    if not os.path.exists(output_path):
+        return "输出文件不存在"
+    for key, reason in (("txt", "原文文本已改动"), ("json", "译文已改动"), ("namedict", "人名表已改动"), ("encoding", "目标编码已改动"), ("mode", "编译模式已改动")):
+        if record.get(key) != inputs[key]:
+            return reason
+    return None
+
+def update_tm(tm_path, transPath, files):
+    # 把本次编译的文件中人工确认的译文写回翻译记忆，返回写入条数
+    count = 0
+    with TranslationMemory(tm_path) as tm:
+        for file in files:
+            json_path = get_json_path(transPath, file)
+            if os.path.exists(json_path):
+                count += tm.update_from(open_json(json_path))
+        return count, len(tm)
+
+def batch_trans(oriPath, transPath, outPath, namedict_path, use_cache=True, jobs=1, force=False, patch=False, tm_path=None, encoding=ENCODING):
+    # 返回本次重新编译成功的文件列表 (中止时返回 None)
+    if patch and encoding != "utf-16-le":
+        print(f"[ERROR] 补丁模式只替换译文字符串，无法改变整个脚本的编码 ({encoding})，请使用文本模式。")
+        return
     os.makedirs(outPath, exist_ok=True)
     try:
         namedict = open_json(namedict_path)
@@ -19,122 +335,77 @@ def batch_trans(oriPath, transPath, outPath, namedict_path):
     print(f"   原文: {oriPath}")
     print(f"   译文: {transPath}")
     print(f"   输出: {outPath}")
+    print(f"   编码: {encoding}")
+    if patch:
+        print(f"   模式: 二进制补丁 (原文为已解密的 .ws2)")
+    if tm_path:
+        print(f"   翻译记忆: {tm_path}")
 
-    count = 0
-    for file in os.listdir(oriPath):
-        if not file.endswith(".txt"):
-            continue
-            
-        # 读取译文数据
-        json_path = os.path.join(transPath, file + ".json")
+    # 读取构建清单，只重新编译输入有变化的脚本
+    manifest_path = get_manifest_path(outPath)
+    manifest = {}
+    if not force and os.path.exists(manifest_path):
         try:
-            transdatas = open_json(json_path)
-        except FileNotFoundError:
-            print(f"警告: 找不到翻译文件 {file}.json，将直接打包原文本。")
-            transdatas = []
-
-        ws2f = WS2FileCompiler(os.path.join(oriPath, file), "utf-16-le")
-
-        # 遍历指令进行回填
-        for c in ws2f.commands:
-            op = c["op"]
-            # 回填人名 (Opcode 15)
-            if op == "15":
-                if len(c["args"]) > 0:
-                    name_arg = c["args"][0]
-                    ori_name = name_arg["value"]
-                    # 去除标记查找
-                    clean_name = ori_name.replace("%LC", "")
-                    if clean_name:
-                        # 查字典替换，没有则用原名
-                        new_name = namedict.get(clean_name, clean_name)
-                        # 重新加上 %LC
-                        name_arg["value"] = "%LC" + new_name
-
-            # 回填对话 (Opcode 14)
-            elif op == "14":
-                for arg in c["args"]:
-                    # 只处理 T 
-                    if arg["type"] == "T":
-                        ori_msg = arg["value"]
-                        
-                        check_val = ori_msg.replace("\\n", "")
-                        check_val = re.sub(r"[%KP]*$", "", check_val)
-                        
-                        if check_val != "":
-                            if len(transdatas) > 0:
-                                transdata = transdatas.pop(0)
-                                transmsg = transdata["message"]
-                                
-                                # 换行符修复
-                                transmsg = transmsg.replace("\n", "\\n")
-                                
-                                # 控制符补全
-                                # 先清理翻译可能自带的尾部控制符
-                                transmsg = re.sub(r"[%KP]*$", "", transmsg)
-                                # 从原文提取尾部控制符
-                                match = re.search(r"[%KP]+$", ori_msg)
-                                if match:
-                                    transmsg += match.group(0)
-                                    
-                                arg["value"] = transmsg
-                            else:
-                                print(f"警告: {file} 翻译条目不足 (Op14, Line {c.get('ori_offset','?')})")
-                        
-                        # Op14 通常只有一段文本，找到并处理后跳出参数循环
-                        break 
-
-            # 回填选项 (Opcode 0F)
-            elif op == "0F":
-                for arg in c["args"]:
-                    # 只处理 T 
-                    if arg["type"] == "T":
-                        if len(transdatas) > 0:
-                            transdata = transdatas.pop(0)
-                            transmsg = transdata["message"]
-                            # 换行符修复
-                            transmsg = transmsg.replace("\n", "\\n")
-                            # 选项处理: 前后加空格
-                            transmsg = "  " + transmsg.strip() + "  "
-                            arg["value"] = transmsg
-                        else:
-                            print(f"警告: {file} 翻译条目不足 (Op0F, Line {c.get('ori_offset','?')})")
-
-        # 检查是否有未使用的翻译
-        if len(transdatas) > 0:
-            print(f"严重警告: {file} 处理结束后，仍有 {len(transdatas)} 条翻译未被使用。")
-            print(f"这意味着 dump 和 trans 的过滤逻辑不一致，或者翻译文件行数对不上。")
+            manifest = open_json(manifest_path)
+        except Exception:
+            print(f"警告: 构建清单 {manifest_path} 无法读取，将全部重新编译。")
+    records = manifest.get("files", {}) if manifest.get("version") == MANIFEST_VERSION else {}
 
-        # 编译与加密
-        try:
-            ws2f.preCompile()
-            temp_out = os.path.join(outPath, file.replace(".txt", "")) # 无后缀的临时文件
-            ws2f.compile(temp_out)
-            
-            # 立即加密
-            data = open_file_b(temp_out)
-            # 加密
-            #data = enc(data) 
-            
-            # 加上 .ws2 后缀保存
-            ws2_out_path = temp_out + ".ws2"
-            if temp_out.endswith(".ws2"):
-                 ws2_out_path = temp_out
+    namedict_hash = hash_file(namedict_path)
+    files = [file for file in os.listdir(oriPath) if file.endswith(".ws2" if patch else ".txt")]
+    inputs = {}
+    reasons = {}
+    skipped = []
+    todo = []
+    for file in files:
+        inputs[file] = get_input_hashes(oriPath, transPath, file, namedict_hash, patch, encoding)
+        reason = "强制重新编译" if force else get_rebuild_reason(records.get(file), inputs[file], get_output_path(outPath, file))
+        if reason is None:
+            skipped.append(file)
+        else:
+            reasons.setdefault(reason, []).append(file)
+            todo.append(file)
 
-            save_file_b(ws2_out_path, data)
-            #print(f"Build: {ws2_out_path}")
-            
-            if os.path.exists(temp_out) and temp_out != ws2_out_path:
-                os.remove(temp_out)
-                
+    if skipped:
+        print(f"  -> 跳过 {len(skipped)} 个文件 (原文、译文、人名表与编码均未改动)")
+    for reason, reason_files in reasons.items():
+        print(f"  -> 重新编译 {len(reason_files)} 个文件 ({reason}): {', '.join(reason_files)}")
+
+    tasks = [(oriPath, transPath, outPath, namedict, file, use_cache, encoding) for file in todo]
+    if not patch and not encoding.lower().startswith("utf"):
+        # 非 UTF 编码: 回填时同时检查编码，先编译到临时文件；有无法编码的字符时一次报告全部问题并中止，不替换任何输出
+        print(f"  -> 编码检查 ({encoding}): {len(todo)} 个文件")
+        results = list(zip(todo, map_jobs(trans_file_checked, tasks, jobs)))
+        if not report_unencodable(outPath, encoding, [(file, problems) for file, (_, problems) in results]):
+            for file, (ok, _) in results:
+                if ok:
+                    os.remove(get_staged_path(outPath, file))
+            return
+        for file, (ok, _) in results:
+            if ok:
+                os.replace(get_staged_path(outPath, file), get_output_path(outPath, file))
+        results = [(file, ok) for file, (ok, _) in results]
+    else:
+        results = zip(todo, map_jobs(patch_file if patch else trans_file, tasks, jobs))
+
+    count = 0
+    new_records = {file: records[file] for file in skipped}
+    built = []
+    for file, ok in results:
+        if ok:
             count += 1
-                
-        except Exception as e:
-            print(f"错误: 编译 {file} 失败 - {e}")
-            import traceback
-            traceback.print_exc()
+            new_records[file] = inputs[file]
+            built.append(file)
+
+    save_json(manifest_path, {"version": MANIFEST_VERSION, "files": new_records})
+
+    if tm_path:
+        # 只写回本次编译的文件，跳过的文件已在之前写回 (需要全部写回时使用 -f)
+        written, total = update_tm(tm_path, transPath, built)
+        print(f"翻译记忆: 写回 {written} 条译文，共 {total} 条记录")
             
-    print(f"\n所有步骤已完成，共处理 {count} 个文件，请注意非文本文件的补齐...")
+    print(f"\n所有步骤已完成，共处理 {count} 个文件，跳过 {len(skipped)} 个未改动的文件，请注意非文本文件的补齐...")
+    return built
 
 def get_arg(value_from_args, prompt_text, default_val):
     if value_from_args is not None:
@@ -149,7 +420,7 @@ if __name__ == "__main__":
     desc_text = textwrap.dedent("""\
     ================================================
     AdvHD WS2 Compiler
-    usage: python trans.py [-i ORIG] [-t TRANS] [-o OUTPUT] [-n DICT]
+    usage: python trans.py [-i ORIG] [-t TRANS] [-o OUTPUT] [-n DICT] [-p]
     """)
 
     parser = argparse.ArgumentParser(
@@ -162,18 +433,27 @@ if __name__ == "__main__":
     parser.add_argument("-t", "--trans", default=None, help="已翻译的 JSON 路径")
     parser.add_argument("-o", "--output", default=None, help="生成的 .ws2 文件输出路径")
     parser.add_argument("-n", "--namedict", default=None, help="人名表路径")
+    parser.add_argument("--no-cache", action="store_true", help="不使用解析结果缓存 (__ws2cache__)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="并行进程数 (默认 1)")
+    parser.add_argument("-f", "--force", action="store_true", help="忽略构建清单，全部重新编译")
+    parser.add_argument("-e", "--encoding", default=ENCODING, help=f"编译目标编码 (默认 {ENCODING}，GBK 版本使用 936)")
+    parser.add_argument("--tm", default=None, help="翻译记忆数据库路径 (SQLite)，编译后写回人工确认的条目 (confirmed/reviewed 标记，或改动过的记忆预填)")
+    parser.add_argument("-p", "--patch", action="store_true", help="补丁模式: -i 为已解密的 .ws2 路径，直接替换二进制中的字符串，不经过反编译文本")
     
     args = parser.parse_args()
 
     if len(sys.argv) == 1:
         print(desc_text)
 
-    final_ori = get_arg(args.input, "请输入原始反编译文本路径", "Rio1_dec_dump")
+    if args.patch:
+        final_ori = get_arg(args.input, "请输入已解密的 .ws2 路径", "Rio1_dec")
+    else:
+        final_ori = get_arg(args.input, "请输入原始反编译文本路径", "Rio1_dec_dump")
     final_trans = get_arg(args.trans, "请输入已翻译的 JSON 路径", "Rio1_dec_dump_json_trans")
     final_out = get_arg(args.output, "请输入生成的 .ws2 文件输出路径", "Rio1_release")
     final_dict = get_arg(args.namedict, "请输入人名表路径", "namedict_trans.json")
 
-    batch_trans(final_ori, final_trans, final_out, final_dict)
+    batch_trans(final_ori, final_trans, final_out, final_dict, not args.no_cache, args.jobs, args.force, args.patch, args.tm, args.encoding)
 
     if len(sys.argv) == 1:
         input("\n按回车键退出...")
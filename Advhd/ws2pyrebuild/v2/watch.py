@@ -0,0 +1,140 @@
+from Lib import *
+from arc import ArcManager
+from trans import ENCODING, batch_trans, forget_manifest_entries, get_output_path
+import os
+import time
+import argparse
+import textwrap
+import sys
+
+# 监视译文 JSON、反编译文本与人名表，变动后只重新编译受影响的脚本并直接改写目标 .arc 中对应的文件
+# 受影响的脚本由 trans.py 的构建清单判定，与手动执行 trans.py 的结果一致
+
+def snapshot(paths):
+    # 返回 {文件路径: (修改时间, 大小)}，paths 中的文件夹只扫描第一层
+    res = {}
+    for path in paths:
+        if os.path.isdir(path):
+            with os.scandir(path) as it:
+                for item in it:
+                    if item.is_file():
+                        st = item.stat()
+                        res[item.path] = (st.st_mtime_ns, st.st_size)
+        elif os.path.isfile(path):
+            st = os.stat(path)
+            res[path] = (st.st_mtime_ns, st.st_size)
+    return res
+
+def rebuild(oriPath, transPath, outPath, namedict_path, arc_path, use_cache, jobs, patch, encoding, do_encrypt):
+    # 增量编译，并把重新编译的脚本写入 .arc
+    built = batch_trans(oriPath, transPath, outPath, namedict_path, use_cache, jobs, False, patch, None, encoding)
+    if not built:
+        return
+    files = {}
+    for file in built:
+        ws2_out_path = get_output_path(outPath, file)
+        files[os.path.basename(ws2_out_path)] = open_file_b(ws2_out_path)
+    try:
+        count = ArcManager.update_entries(arc_path, files, do_encrypt)
+    except Exception:
+        # 封包未更新 (例如游戏运行中锁定封包): 从构建清单中去掉这些脚本，重试时重新编译并写入
+        forget_manifest_entries(outPath, built)
+        raise
+    print(f">>已更新封包 {arc_path}: {count} 个文件 ({time.strftime('%H:%M:%S')})")
+
+def watch(oriPath, transPath, outPath, namedict_path, arc_path, interval=1.0, debounce=1.0, use_cache=True, jobs=1, patch=False, encoding=ENCODING, do_encrypt=True):
+    print(f"\n>> Command: Watch")
+    print(f"   原文: {oriPath}")
+    print(f"   译文: {transPath}")
+    print(f"   人名表: {namedict_path}")
+    print(f"   输出: {outPath}")
+    print(f"   封包: {arc_path}")
+    print(f"   加密: {'是' if do_encrypt else '否'}")
+
+    for path in (oriPath, transPath, arc_path):
+        if not os.path.exists(path):
+            print(f"[ERROR] 找不到输入: {path}")
+            return
+
+    args = (oriPath, transPath, outPath, namedict_path, arc_path, use_cache, jobs, patch, encoding, do_encrypt)
+    paths = (oriPath, transPath, namedict_path)
+
+    # 启动时先同步一次，此后只在文件变动时重新编译
+    # 快照在编译前记录: 编译期间保存的改动与快照不同，会触发下一次编译
+    last = snapshot(paths)
+    # changed_at 为 0 表示立即编译 (启动时与更新失败后)
+    changed_at = 0
+    print(f"\n>>开始监视 (间隔 {interval}s，等待 {debounce}s 无新改动后编译，Ctrl+C 退出)")
+    try:
+        while True:
+            if changed_at is not None and time.monotonic() - changed_at >= debounce:
+                changed_at = None
+                try:
+                    rebuild(*args)
+                except Exception as e:
+                    # 游戏运行中锁定封包等错误不退出，等待 debounce 后重试
+                    print(f"[ERROR] 更新失败: {e}，{debounce}s 后重试")
+                    changed_at = time.monotonic()
+            time.sleep(interval)
+            current = snapshot(paths)
+            if current != last:
+                # 仍在保存/批量修改中，重新计时
+                last = current
+                changed_at = time.monotonic()
+    except KeyboardInterrupt:
+        print("\n>>已停止监视")
+
+def get_arg(value_from_args, prompt_text, default_val):
+    if value_from_args is not None:
+        return value_from_args
+
+    user_in = input(f"{prompt_text} (默认: {default_val}): ").strip()
+    if not user_in:
+        return default_val
+    return user_in.strip('"')
+
+if __name__ == "__main__":
+    desc_text = textwrap.dedent("""\
+    ================================================
+    AdvHD WS2 Watch (JSON -> .ws2 -> .arc)
+    usage: python watch.py [-i ORIG] [-t TRANS] [-o OUTPUT] [-n DICT] [-a ARC] [-p]
+    """)
+
+    parser = argparse.ArgumentParser(
+        description=desc_text,
+        formatter_class=argparse.RawTextHelpFormatter,
+        usage=argparse.SUPPRESS
+    )
+
+    parser.add_argument("-i", "--input", default=None, help="原始反编译文本路径 .txt")
+    parser.add_argument("-t", "--trans", default=None, help="已翻译的 JSON 路径")
+    parser.add_argument("-o", "--output", default=None, help="生成的 .ws2 文件输出路径")
+    parser.add_argument("-n", "--namedict", default=None, help="人名表路径")
+    parser.add_argument("-a", "--arc", default=None, help="要更新的 .arc 路径 (需先用 arc.py pack 完整打包一次)")
+    parser.add_argument("--interval", type=float, default=1.0, help="检查间隔秒数 (默认 1)")
+    parser.add_argument("--debounce", type=float, default=1.0, help="最后一次改动后等待的秒数 (默认 1)")
+    parser.add_argument("--no-encrypt", action="store_true", help="封包内的 .ws2 不加密")
+    parser.add_argument("--no-cache", action="store_true", help="不使用解析结果缓存 (__ws2cache__)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="并行进程数 (默认 1)")
+    parser.add_argument("-e", "--encoding", default=ENCODING, help=f"编译目标编码 (默认 {ENCODING}，GBK 版本使用 936)")
+    parser.add_argument("-p", "--patch", action="store_true", help="补丁模式: -i 为已解密的 .ws2 路径")
+
+    args = parser.parse_args()
+
+    if len(sys.argv) == 1:
+        print(desc_text)
+
+    if args.patch:
+        final_ori = get_arg(args.input, "请输入已解密的 .ws2 路径", "Rio1_dec")
+    else:
+        final_ori = get_arg(args.input, "请输入原始反编译文本路径", "Rio1_dec_dump")
+    final_trans = get_arg(args.trans, "请输入已翻译的 JSON 路径", "Rio1_dec_dump_json_trans")
+    final_out = get_arg(args.output, "请输入生成的 .ws2 文件输出路径", "Rio1_release")
+    final_dict = get_arg(args.namedict, "请输入人名表路径", "namedict_trans.json")
+    final_arc = get_arg(args.arc, "请输入要更新的 .arc 路径", "Rio1.chs")
+
+    watch(final_ori, final_trans, final_out, final_dict, final_arc, args.interval, args.debounce,
+          not args.no_cache, args.jobs, args.patch, args.encoding, not args.no_encrypt)
+
+    if len(sys.argv) == 1:
+        input("\n按回车键退出...")
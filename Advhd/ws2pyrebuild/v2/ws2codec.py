@@ -0,0 +1,70 @@
+import os
+
+# .ws2 加密/解密算法 (按字节循环移位)
+# Encrypt: (b << 2) | (b >> 6)  -> 循环左移 2 位
+# Decrypt: (b << 6) | (b >> 2)  -> 循环右移 2 位 (即左移6位)
+# 逐字节的 Python 循环很慢，这里预先生成 256 项的查找表，交给 bytes.translate 在 C 层完成
+
+ROTL2_TABLE = bytes(((b << 2) & 0xFF) | (b >> 6) for b in range(256))
+ROTR2_TABLE = bytes(((b << 6) & 0xFF) | (b >> 2) for b in range(256))
+
+# 流式处理时每次读取的块大小
+CHUNK_SIZE = 4 * 1024 * 1024
+
+def rotate_left_2(data) -> bytes:
+    # 加密: 循环左移 2 位
+    return bytes(data).translate(ROTL2_TABLE)
+
+def rotate_right_2(data) -> bytes:
+    # 解密: 循环右移 2 位
+    return bytes(data).translate(ROTR2_TABLE)
+
+def xor_repeat(data, key, offset=0) -> bytes:
+    # 循环密钥异或，offset 为 data 首字节在整个数据流中的位置 (分块处理时保持密钥相位)
+    # 把数据和展开后的密钥当作两个大整数做一次异或，避免逐字节循环
+    data = bytes(data)
+    length = len(data)
+    if not key or length == 0:
+        return data
+    key = bytes(key)
+    shift = offset % len(key)
+    key = key[shift:] + key[:shift]
+    stream = (key * (length // len(key) + 1))[:length]
+    res = int.from_bytes(data, 'little') ^ int.from_bytes(stream, 'little')
+    return res.to_bytes(length, 'little')
+
+def get_codec(mode, key=None):
+    # 返回 (chunk, offset) -> bytes 的处理函数
+    # mode: 'enc' / 'dec' (循环移位) 或 'xor' (循环密钥异或)
+    if mode == 'enc':
+        return lambda chunk, offset: chunk.translate(ROTL2_TABLE)
+    if mode == 'dec':
+        return lambda chunk, offset: chunk.translate(ROTR2_TABLE)
+    if mode == 'xor':
+        return lambda chunk, offset: xor_repeat(chunk, key, offset)
+    raise ValueError(f"Unknown codec mode: {mode}")
+
+def process_stream(in_f, out_f, mode, key=None, chunk_size=CHUNK_SIZE, limit=None) -> int:
+    # 分块读取 in_f，处理后写入 out_f，内存占用只与 chunk_size 有关
+    # limit 不为 None 时最多处理 limit 字节，返回实际处理的字节数
+    codec = get_codec(mode, key)
+    total = 0
+    while limit is None or total < limit:
+        size = chunk_size if limit is None else min(chunk_size, limit - total)
+        chunk = in_f.read(size)
+        if not chunk:
+            break
+        out_f.write(codec(chunk, total))
+        total += len(chunk)
+    return total
+
+def process_file(path, output_path, mode, key=None, chunk_size=CHUNK_SIZE) -> int:
+    # 流式处理单个文件，可用于超过内存大小的文件
+    # 输入输出为同一路径时先写入临时文件再替换
+    same_file = os.path.abspath(path) == os.path.abspath(output_path)
+    temp_path = output_path + ".tmp" if same_file else output_path
+    with open(path, 'rb') as in_f, open(temp_path, 'wb') as out_f:
+        total = process_stream(in_f, out_f, mode, key, chunk_size)
+    if same_file:
+        os.replace(temp_path, output_path)
+    return total